@@ -1,5 +1,5 @@
 import streamlit as st
-import PyPDF2
+import fitz  # PyMuPDF
 import io
 from datetime import datetime
 import os
@@ -36,38 +36,45 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def merge_pdfs_alternating(pdf1_file, pdf2_file):
-    """Merge two PDFs with alternating pages"""
+def merge_pdfs_alternating(pdf1_bytes, pdf2_bytes):
+    """Merge two PDFs with alternating pages, returning (buffer, page_counts, error)"""
     try:
-        # Create PDF reader objects
-        pdf1_reader = PyPDF2.PdfReader(pdf1_file)
-        pdf2_reader = PyPDF2.PdfReader(pdf2_file)
+        # Open both PDFs with PyMuPDF
+        pdf1_doc = fitz.open(stream=pdf1_bytes, filetype="pdf")
+        pdf2_doc = fitz.open(stream=pdf2_bytes, filetype="pdf")
         
-        # Create PDF writer object
-        pdf_writer = PyPDF2.PdfWriter()
+        # Create output document
+        output_doc = fitz.open()
         
-        # Get the maximum number of pages between both PDFs
-        max_pages = max(len(pdf1_reader.pages), len(pdf2_reader.pages))
+        pdf1_pages = len(pdf1_doc)
+        pdf2_pages = len(pdf2_doc)
+        min_pages = min(pdf1_pages, pdf2_pages)
         
-        # Merge pages alternately
-        for i in range(max_pages):
-            # Add page from first PDF if it exists
-            if i < len(pdf1_reader.pages):
-                pdf_writer.add_page(pdf1_reader.pages[i])
-            
-            # Add page from second PDF if it exists
-            if i < len(pdf2_reader.pages):
-                pdf_writer.add_page(pdf2_reader.pages[i])
+        # Merge pages alternately while both PDFs have pages
+        for i in range(min_pages):
+            output_doc.insert_pdf(pdf1_doc, from_page=i, to_page=i)
+            output_doc.insert_pdf(pdf2_doc, from_page=i, to_page=i)
         
-        # Create a bytes buffer for the output
+        # Append the extra pages of the longer PDF in a single range copy
+        if pdf1_pages > min_pages:
+            output_doc.insert_pdf(pdf1_doc, from_page=min_pages, to_page=pdf1_pages - 1)
+        elif pdf2_pages > min_pages:
+            output_doc.insert_pdf(pdf2_doc, from_page=min_pages, to_page=pdf2_pages - 1)
+        
+        # Create a bytes buffer for the output - garbage=4 merges identical streams at save time
         output_buffer = io.BytesIO()
-        pdf_writer.write(output_buffer)
+        output_doc.save(output_buffer, garbage=4, deflate=True, clean=True)
         output_buffer.seek(0)
         
-        return output_buffer, None
+        output_doc.close()
+        page_counts = (pdf1_pages, pdf2_pages)
+        pdf1_doc.close()
+        pdf2_doc.close()
+        
+        return output_buffer, page_counts, None
         
     except Exception as e:
-        return None, str(e)
+        return None, None, str(e)
 
 def main():
     # Header
@@ -106,25 +113,26 @@ def main():
     if pdf1 is not None and pdf2 is not None:
         if st.button("🔄 Merge PDFs", type="primary", use_container_width=True):
             with st.spinner("Merging PDFs with alternating pages..."):
-                # Perform the merge
-                merged_pdf, error = merge_pdfs_alternating(pdf1, pdf2)
+                # Read each upload once and perform the merge
+                pdf1_bytes = pdf1.getvalue()
+                pdf2_bytes = pdf2.getvalue()
+                merged_pdf, page_counts, error = merge_pdfs_alternating(pdf1_bytes, pdf2_bytes)
                 
                 if error:
                     st.error(f"Error merging PDFs: {error}")
                 else:
                     st.success("✅ PDFs merged successfully!")
                     
-                    # Display merge statistics
-                    pdf1_reader = PyPDF2.PdfReader(pdf1)
-                    pdf2_reader = PyPDF2.PdfReader(pdf2)
+                    # Display merge statistics (page counts captured during the merge)
+                    pdf1_pages, pdf2_pages = page_counts
                     
                     col1, col2, col3 = st.columns(3)
                     with col1:
-                        st.metric("PDF 1 Pages", len(pdf1_reader.pages))
+                        st.metric("PDF 1 Pages", pdf1_pages)
                     with col2:
-                        st.metric("PDF 2 Pages", len(pdf2_reader.pages))
+                        st.metric("PDF 2 Pages", pdf2_pages)
                     with col3:
-                        st.metric("Merged Pages", len(pdf1_reader.pages) + len(pdf2_reader.pages))
+                        st.metric("Merged Pages", pdf1_pages + pdf2_pages)
                     
                     # Download button
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -163,7 +171,7 @@ def main():
         st.header("⚙️ Technical Info")
         st.markdown("""
         - Built with Streamlit
-        - Uses PyPDF2 for PDF processing
+        - Uses PyMuPDF for PDF processing
         - Works entirely in your browser
         - No files stored on server
         """)
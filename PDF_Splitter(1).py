@@ -1,75 +1,512 @@
 import streamlit as st
-import pypdf
 import io
 import base64
+import hashlib
+import os
+import atexit
+import tempfile
+import shutil
+import threading
 import fitz  # PyMuPDF
-from pypdf import PdfReader, PdfWriter, PageObject
+import numpy as np
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
 
-def create_split_pdf(original_pdf, split_data):
-    """Create a new PDF with horizontal splits based on slider positions"""
-    output_pdf = PdfWriter()
+# Long edge of the rendered page preview in pixels
+PREVIEW_LONG_EDGE_PX = 900
+PREVIEW_MIN_ZOOM = 0.6
+PREVIEW_MAX_ZOOM = 1.5
+
+# Uploads that keep a spooled copy on disk for the render workers
+SPOOLED_UPLOADS_MAX = 4
+
+# Quick position choices -> slider value (Clear All resets every slider on the page)
+QUICK_POSITIONS = {"25%": 25, "50%": 50, "75%": 75, "Reset": 0, "Clear All": None}
+
+def create_split_pdf(pdf_bytes, split_data):
+    """Create a new PDF with horizontal splits based on slider positions, returning (pdf_bytes, page_count)"""
+    src_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    total_pages = len(src_doc)
+    
+    # Nothing to split: hand back the original file untouched instead of rewriting every page
+    if not any(split_data.values()):
+        src_doc.close()
+        return pdf_bytes, total_pages
     
-    for page_num in range(len(original_pdf.pages)):
+    # Splitting only edits cropboxes, so one in-memory pass is cheaper than farming pages out to processes
+    output_doc = fitz.open()
+    
+    # Page boxes read once up front, straight from the page tree without loading each page
+    page_boxes = [src_doc.page_cropbox(page_num) for page_num in range(total_pages)]
+    
+    # Unsplit pages are collected into runs and copied with one insert_pdf call per run
+    run_start = 0
+    
+    for page_num in range(total_pages):
         splits = split_data.get(page_num, [])
-        original_page = original_pdf.pages[page_num]
-        page_width = original_page.mediabox.width
-        page_height = original_page.mediabox.height
         
-        if splits:  # If splits exist for this page
-            # Filter out splits at 0% and 100%, sort the rest
-            valid_splits = [s for s in splits if 0 < s < 100]
-            valid_splits.sort()
+        # Filter out splits at 0% and 100%, drop duplicates and sort the rest
+        valid_splits = sorted(set(int(s) for s in splits if 0 < s < 100))
+        
+        if valid_splits:
+            # Flush the run of unsplit pages before this one
+            if run_start < page_num:
+                output_doc.insert_pdf(src_doc, from_page=run_start, to_page=page_num - 1)
+            run_start = page_num + 1
             
-            if valid_splits:
-                # Convert percentages to actual coordinates (for height)
-                split_coords = [(s / 100) * page_height for s in valid_splits]
-                all_splits = [0] + split_coords + [page_height]
-                
-                # Create subpages for each horizontal segment
-                for i in range(len(all_splits) - 1):
-                    top = all_splits[i]
-                    bottom = all_splits[i + 1]
-                    height = bottom - top
-                    
-                    # Create a new blank page with the segment height
-                    new_page = PageObject.create_blank_page(
-                        width=page_width,
-                        height=height
-                    )
-                    
-                    # Merge the original page segment onto the new page
-                    new_page.merge_transformed_page(
-                        original_page,
-                        ctm=(1, 0, 0, 1, 0, -top)  # Shift vertically
-                    )
-                    output_pdf.add_page(new_page)
-            else:
-                # No valid splits, add original page
-                output_pdf.add_page(original_page)
+            # Percentages are measured from the top, which is PyMuPDF's y origin too
+            page_rect = page_boxes[page_num]
+            page_height = page_rect.height
+            # Segment boundaries and heights in one vectorized pass
+            boundaries = np.concatenate((
+                [0.0], np.asarray(valid_splits, dtype=float) * (page_height / 100.0), [page_height]
+            ))
+            heights = np.diff(boundaries)
+            # Skip degenerate zero-height segments
+            keep = heights >= 1e-3
+            
+            # Each horizontal segment is the same page with a narrower cropbox -
+            # only the page dictionary changes, the content stream is copied as is
+            # The source page is grafted once; further segments are in-document copies of it
+            base_page = None
+            for top, bottom in zip(boundaries[:-1][keep].tolist(), boundaries[1:][keep].tolist()):
+                if base_page is None:
+                    output_doc.insert_pdf(src_doc, from_page=page_num, to_page=page_num)
+                    base_page = len(output_doc) - 1
+                else:
+                    output_doc.fullcopy_page(base_page)
+                output_doc[-1].set_cropbox(fitz.Rect(
+                    page_rect.x0, page_rect.y0 + top,
+                    page_rect.x1, page_rect.y0 + bottom
+                ))
+    
+    # Trailing run of unsplit pages
+    if run_start < total_pages:
+        output_doc.insert_pdf(src_doc, from_page=run_start, to_page=total_pages - 1)
+    
+    page_count = len(output_doc)
+    # Serialize straight to one bytes object; garbage=4 also merges duplicated resources
+    output_bytes = output_doc.tobytes(garbage=4, deflate=True, deflate_images=True)
+    output_doc.close()
+    src_doc.close()
+    fitz.TOOLS.store_shrink(100)
+    
+    return output_bytes, page_count
+
+@st.cache_resource(max_entries=4)
+def load_fitz_doc(file_id, _pdf_bytes):
+    """Open a PDF once and share the handle across reruns - keyed on the content hash, the bytes are not re-hashed"""
+    return fitz.open(stream=_pdf_bytes, filetype="pdf")
+
+def _remove_file(path):
+    """Delete a temp file if it is still there"""
+    if os.path.exists(path):
+        os.remove(path)
+
+@st.cache_resource
+def get_render_spool():
+    """Private temp directory holding the render pool's copies of uploads - removed with its contents at exit"""
+    spool_dir = tempfile.mkdtemp(prefix="pdf_splitter_")
+    atexit.register(shutil.rmtree, spool_dir, ignore_errors=True)
+    return {"dir": spool_dir, "paths": {}, "lock": threading.Lock()}
+
+def pdf_temp_path(file_id, pdf_bytes):
+    """Path of the upload's copy in the render spool, written on first use - workers open it instead of receiving the bytes"""
+    spool = get_render_spool()
+    with spool["lock"]:
+        path = spool["paths"].pop(file_id, None)
+        if path is None:
+            path = os.path.join(spool["dir"], f"{file_id}.pdf")
+            # Write under a private name and rename, so a worker never opens a half-written file
+            part_path = path + ".part"
+            with open(part_path, "wb") as part_file:
+                part_file.write(pdf_bytes)
+            os.replace(part_path, path)
+        # Most recently used last; the oldest uploads beyond the limit are deleted
+        spool["paths"][file_id] = path
+        while len(spool["paths"]) > SPOOLED_UPLOADS_MAX:
+            _remove_file(spool["paths"].pop(next(iter(spool["paths"]))))
+    return path
+
+def release_pdf_temp_paths(keep=None):
+    """Delete every spooled upload except keep - render workers close their handles to them on their next task"""
+    spool = get_render_spool()
+    with spool["lock"]:
+        for file_id in [f for f in spool["paths"] if f != keep]:
+            _remove_file(spool["paths"].pop(file_id))
+
+# Documents opened inside a render worker process, keyed by content hash, as (doc, path)
+_WORKER_DOCS = {}
+
+def _worker_doc(file_id, pdf_path):
+    """Open (or reuse) the document inside a render worker - only the most recent files stay open"""
+    # Close handles to uploads the main process has released (their spooled file is gone)
+    for stale_id in [f for f, (_, path) in _WORKER_DOCS.items() if not os.path.exists(path)]:
+        _WORKER_DOCS.pop(stale_id)[0].close()
+    entry = _WORKER_DOCS.get(file_id)
+    if entry is None:
+        if len(_WORKER_DOCS) >= 2:
+            _WORKER_DOCS.pop(next(iter(_WORKER_DOCS)))[0].close()
+        entry = _WORKER_DOCS[file_id] = (fitz.open(pdf_path), pdf_path)
+    return entry[0]
+
+def _render_page_image(file_id, pdf_path, page_num, jpg_quality, lossless):
+    """Rasterize one page to a base64 JPEG (or PNG if lossless) - runs in a render worker process"""
+    page = _worker_doc(file_id, pdf_path).load_page(page_num)
+    # Scale so the long edge hits a fixed pixel size - the browser would downsample anything larger.
+    # Clamped so tiny pages are not blown up past 1.5x and huge sheets stay legible
+    scale = min(PREVIEW_MAX_ZOOM, max(PREVIEW_MIN_ZOOM, PREVIEW_LONG_EDGE_PX / max(page.rect.width, page.rect.height)))
+    # Pin RGB explicitly - both the PIL frombuffer("RGB") and JPEG paths rely on 3 bytes per pixel
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csRGB, alpha=False)
+    try:
+        if lossless:
+            # Encode with PIL at compress_level=1 - much faster than MuPDF's max-compression PNG for a slightly larger file
+            # samples_mv is a memoryview over MuPDF's buffer, so no Python bytes copy of the pixels
+            img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", 0, 1)
+            buf = io.BytesIO()
+            img.save(buf, "PNG", optimize=False, compress_level=1)
+            img_data = buf.getbuffer()  # memoryview, encoded below without an intermediate bytes copy
         else:
-            # No splits, add original page
-            output_pdf.add_page(original_page)
+            # JPEG is several times smaller than PNG for rendered pages and much cheaper to encode
+            img_data = pix.tobytes("jpeg", jpg_quality=jpg_quality)
+        
+        # base64 output is pure ASCII, which has a faster decode path than UTF-8
+        base64_img = base64.b64encode(img_data).decode('ascii')
+    finally:
+        # Release the C-side pixmap and evict MuPDF's cached page resources right away
+        pix = None
+        fitz.TOOLS.store_shrink(100)
     
-    return output_pdf
+    return base64_img
+
+@st.cache_resource
+def get_render_pool():
+    """Process pool shared by all sessions - rasterization is CPU-bound and would otherwise hold the GIL"""
+    return ProcessPoolExecutor(max_workers=max(2, (os.cpu_count() or 1) - 1))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_page_image(file_id, _pdf_bytes, page_num, jpg_quality=80, lossless=False):
+    """Convert PDF page to base64 image - cached per (file, page, quality); misses render in the worker pool"""
+    key = (file_id, page_num, jpg_quality, lossless)
+    renders = page_render_registry()
+    # Pick up a prefetched render if one is in flight, otherwise render now
+    future = renders["pending"].pop(key, None) or _submit_page_render(file_id, _pdf_bytes, page_num, jpg_quality, lossless)
+    base64_img = future.result()
+    _remember(renders["rendered"], key, 64)
+    return base64_img
+
+def _submit_page_render(file_id, pdf_bytes, page_num, jpg_quality, lossless):
+    """Queue one page render in the worker pool and return its future"""
+    # Only the small task arguments cross the pipe - workers open the file from disk once
+    return get_render_pool().submit(
+        _render_page_image, file_id, pdf_temp_path(file_id, pdf_bytes), page_num, jpg_quality, lossless
+    )
+
+@st.cache_resource
+def page_render_registry():
+    """Prefetched renders still in flight and keys already rendered into get_page_image's cache"""
+    return {"pending": {}, "rendered": {}}
+
+def _remember(entries, key, limit, value=None):
+    """Insert into an insertion-ordered dict, dropping the oldest entries beyond limit"""
+    entries[key] = value
+    while len(entries) > limit:
+        entries.pop(next(iter(entries)))
+
+def prefetch_page_image(file_id, pdf_bytes, page_num, jpg_quality=80, lossless=False):
+    """Start rendering a page in the worker pool without waiting - get_page_image collects the result later"""
+    key = (file_id, page_num, jpg_quality, lossless)
+    renders = page_render_registry()
+    if key in renders["rendered"] or key in renders["pending"]:
+        return
+    _remember(renders["pending"], key, 8, _submit_page_render(file_id, pdf_bytes, page_num, jpg_quality, lossless))
 
-def get_page_image(pdf_reader, page_num):
-    """Convert PDF page to base64 image"""
-    # Create a temporary PDF with just this page
-    temp_pdf = PdfWriter()
-    temp_pdf.add_page(pdf_reader.pages[page_num])
-    
-    temp_pdf_bytes = io.BytesIO()
-    temp_pdf.write(temp_pdf_bytes)
-    temp_pdf_bytes.seek(0)
-    
-    # Convert PDF page to base64 for display
-    doc = fitz.open("pdf", temp_pdf_bytes.read())
-    page = doc[0]
-    pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
-    img_data = pix.tobytes("png")
-    doc.close()
-    
-    return base64.b64encode(img_data).decode()
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_preview_html(file_id, _pdf_bytes, page_num, jpg_quality=80, lossless=False):
+    """Build the preview HTML (page image + slider overlay) - cached per (file, page, quality), splits come in via CSS variables"""
+    # Convert current page to image for display
+    base64_img = get_page_image(file_id, _pdf_bytes, page_num, jpg_quality, lossless)
+    image_mime = "image/png" if lossless else "image/jpeg"
+    
+    # Create the interactive HTML with vertical sliders (parts joined once at the end).
+    # Positions are read from --s{i}/--h{i}/--d{i} custom properties, so the markup never changes with the splits
+    slider_bar_parts = []
+    horizontal_line_parts = []
+    
+    for i in range(10):
+        # Create slider bar
+        slider_bar_parts.append(f'''
+        <div class="slider-container" id="slider{i}">
+            <div class="slider-bar" onclick="selectSlider({i})">
+                <div class="slider-track"></div>
+                <div class="slider-handle" style="top: var(--h{i});">
+                    <div class="handle-label">{i+1}</div>
+                </div>
+            </div>
+        </div>
+        ''')
+        
+        # Horizontal line, only displayed for active sliders
+        horizontal_line_parts.append(f'<div class="horizontal-line" style="top: var(--s{i}); display: var(--d{i});"></div>')
+    
+    slider_bars_html = "".join(slider_bar_parts)
+    horizontal_lines_html = "".join(horizontal_line_parts)
+    
+    html_content = f'''
+    <!DOCTYPE html>
+    <html>
+    <head>
+    <style>:root {{ /*SPLIT_VARS*/ }}</style>
+    <style>
+    .preview-container {{
+        position: relative;
+        display: inline-block;
+        border: 2px solid #ccc;
+        margin: 20px 0;
+        background: white;
+    }}
+    .page-image {{
+        max-width: 100%;
+        height: auto;
+        display: block;
+    }}
+    .slider-container {{
+        position: absolute;
+        top: 0;
+        bottom: 0;
+        width: 30px;
+        cursor: pointer;
+        z-index: 10;
+    }}
+    .slider-bar {{
+        position: absolute;
+        top: 10px;
+        bottom: 10px;
+        left: 5px;
+        width: 20px;
+        background: rgba(255, 68, 68, 0.3);
+        border-radius: 10px;
+        border: 2px solid #ff4444;
+    }}
+    .slider-track {{
+        position: absolute;
+        top: 0;
+        bottom: 0;
+        left: 7px;
+        width: 6px;
+        background: #ff4444;
+        border-radius: 3px;
+    }}
+    .slider-handle {{
+        position: absolute;
+        left: -5px;
+        width: 30px;
+        height: 20px;
+        background: #ff4444;
+        border-radius: 10px;
+        cursor: grab;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        transition: all 0.2s;
+    }}
+    .slider-handle:hover {{
+        background: #ff0000;
+        transform: scale(1.1);
+    }}
+    .handle-label {{
+        color: white;
+        font-size: 10px;
+        font-weight: bold;
+    }}
+    .horizontal-line {{
+        position: absolute;
+        left: 0;
+        right: 0;
+        height: 2px;
+        background-color: #ff4444;
+        pointer-events: none;
+        z-index: 5;
+    }}
+    .slider-active {{
+        background: rgba(255, 0, 0, 0.5) !important;
+        border-color: #ff0000 !important;
+    }}
+    </style>
+    </head>
+    <body>
+    <div class="preview-container" id="previewContainer">
+        <img src="data:{image_mime};base64,{base64_img}" class="page-image" id="pageImage">
+        {horizontal_lines_html}
+        {slider_bars_html}
+    </div>
+    
+    <script>
+    let selectedSlider = null;
+    
+    function selectSlider(sliderIndex) {{
+        selectedSlider = sliderIndex;
+        // Update all slider appearances
+        for (let i = 0; i < 10; i++) {{
+            const slider = document.getElementById('slider' + i);
+            if (i === sliderIndex) {{
+                slider.querySelector('.slider-bar').classList.add('slider-active');
+            }} else {{
+                slider.querySelector('.slider-bar').classList.remove('slider-active');
+            }}
+        }}
+        // Send selection to Streamlit
+        window.parent.postMessage({{
+            type: 'streamlit:setComponentValue',
+            value: 'SELECT:' + sliderIndex
+        }}, '*');
+    }}
+    
+    // Initialize slider positions
+    window.addEventListener('load', function() {{
+        // Select first slider by default
+        selectSlider(0);
+    }});
+    </script>
+    </body>
+    </html>
+    '''
+    
+    return html_content
+
+def split_css_vars(splits):
+    """Tiny per-rerun CSS custom-property block that positions the cached preview's lines and handles"""
+    return "".join(
+        f"--s{i}:{v}%;--h{i}:{100 - v}%;--d{i}:{'block' if 0 < v < 100 else 'none'};"
+        for i, v in enumerate(splits)
+    )
+
+def active_split_positions(splits):
+    """Distinct slider values that produce a split (strictly between 0% and 100%), sorted from the top - as Generate applies them"""
+    return sorted(set(int(s) for s in splits if 0 < s < 100))
+
+def set_page_splits(page_num, splits):
+    """Store a page's slider values and keep the normalized active-split map for Generate in step"""
+    st.session_state.split_data[page_num] = splits
+    active_splits = active_split_positions(st.session_state.split_data[page_num])
+    if active_splits:
+        st.session_state.active_splits_by_page[page_num] = active_splits
+    else:
+        st.session_state.active_splits_by_page.pop(page_num, None)
+
+def apply_slider_position(page_num, slider_index):
+    """Form callback: persist the submitted slider value into the page's split data"""
+    new_value = st.session_state[f"slider_control_{page_num}"]
+    updated_splits = st.session_state.split_data[page_num].copy()
+    updated_splits[slider_index] = new_value
+    set_page_splits(page_num, updated_splits)
+    st.session_state.slider_positions[slider_index] = new_value
+
+def apply_quick_position(page_num, slider_index):
+    """Segmented-control callback: move the selected slider (or clear the page), then reset the control"""
+    key = f"qp_{page_num}"
+    choice = st.session_state[key]
+    if choice is None:
+        return
+    
+    if choice == "Clear All":
+        set_page_splits(page_num, 0)
+        new_value = 0
+    else:
+        new_value = QUICK_POSITIONS[choice]
+        updated_splits = st.session_state.split_data[page_num].copy()
+        updated_splits[slider_index] = new_value
+        set_page_splits(page_num, updated_splits)
+    
+    # Move the form slider too, otherwise the next Apply submits its stale value and undoes this
+    st.session_state[f"slider_control_{page_num}"] = new_value
+    st.session_state.slider_positions[slider_index] = new_value
+    
+    # Deselect so the same choice can be applied again later
+    st.session_state[key] = None
+
+@st.fragment
+def page_editor_fragment(file_id, current_page_num):
+    """Preview, slider controls and split summary - slider edits rerun only this fragment, not the whole app"""
+    # Get current page data
+    current_splits = st.session_state.split_data[current_page_num].tolist()
+    
+    # Create interactive slider interface
+    st.markdown("### Interactive Slider Interface")
+    st.markdown("**Click on the slider bars and use the sliders below to adjust positions**")
+    
+    # Preview HTML is cached per page and quality; slider moves only swap in new CSS variables
+    html_content = build_preview_html(
+        file_id, st.session_state.pdf_bytes, current_page_num,
+        st.session_state.preview_quality, st.session_state.preview_lossless
+    ).replace("/*SPLIT_VARS*/", split_css_vars(current_splits), 1)
+    
+    # Display the interactive preview
+    st.components.v1.html(html_content, height=600)
+    
+    # Slider controls for the selected slider
+    st.markdown("### Adjust Selected Slider")
+    
+    # Get selected slider from session state or default to 0
+    selected_slider = st.session_state.get('selected_slider', 0)
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.markdown(f"**Selected: Slider {selected_slider + 1}**")
+        st.markdown(f"Current position: **{current_splits[selected_slider]}%** from top")
+    
+    with col2:
+        # Slider inside a form: dragging stays client-side and only "Apply" reruns the script
+        with st.form(key=f"slider_form_{current_page_num}", clear_on_submit=False):
+            # Seeded through session state (no value=) so the callbacks can move the slider without a warning
+            slider_key = f"slider_control_{current_page_num}"
+            st.session_state[slider_key] = current_splits[selected_slider]
+            st.slider(
+                f"Position for Slider {selected_slider + 1}",
+                min_value=0,
+                max_value=100,
+                key=slider_key,
+                help="Adjust the vertical position of the selected slider"
+            )
+            # The callback runs before the rerun, so the preview above is drawn with the new value
+            st.form_submit_button(
+                "Apply",
+                on_click=apply_slider_position,
+                args=(current_page_num, selected_slider)
+            )
+    
+    # Display active splits information
+    active_splits = active_split_positions(current_splits)
+    st.markdown(f"**Active horizontal splits on this page: {len(active_splits)}**")
+    if active_splits:
+        st.write(f"Split positions (from top): {active_splits}%")
+        st.write(f"This will create {len(active_splits) + 1} horizontal segments")
+        st.info("💡 **Horizontal splitting**: Each horizontal band becomes a separate page")
+    
+    # Quick position control - one widget, applied in its on_change callback before the rerun
+    st.markdown("### Quick Positions")
+    st.segmented_control(
+        "Quick position",
+        list(QUICK_POSITIONS),
+        default=None,
+        key=f"qp_{current_page_num}",
+        on_change=apply_quick_position,
+        args=(current_page_num, selected_slider),
+        label_visibility="collapsed"
+    )
+    
+    # Show split summary for all pages
+    st.markdown("### Split Summary")
+    # One element for the whole summary instead of one st.write per page.
+    # Counts come from the normalized active splits, so sliders sharing a position count once, like in the output
+    active_splits_by_page = st.session_state.active_splits_by_page
+    summary_lines = []
+    for page_num in range(len(st.session_state.split_data)):
+        split_count = len(active_splits_by_page.get(page_num, ()))
+        status = "✅" if split_count else "⏳"
+        current = "📍" if page_num == current_page_num else ""
+        summary_lines.append(f"{status} {current} Page {page_num + 1}: {split_count} splits → {split_count + 1} horizontal segments")
+    st.markdown("\n\n".join(summary_lines))
 
 def main():
     st.set_page_config(page_title="PDF Horizontal Splitter", layout="wide")
@@ -86,35 +523,59 @@ def main():
     
     # Initialize session state
     if 'split_data' not in st.session_state:
-        st.session_state.split_data = {}
+        st.session_state.split_data = None  # (pages, 10) uint8 array, created once the page count is known
+    if 'active_splits_by_page' not in st.session_state:
+        st.session_state.active_splits_by_page = {}
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 0
-    if 'uploaded_pdf' not in st.session_state:
-        st.session_state.uploaded_pdf = None
+    if 'file_id' not in st.session_state:
+        st.session_state.file_id = None
     if 'slider_positions' not in st.session_state:
         st.session_state.slider_positions = [0] * 10
+    if 'preview_quality' not in st.session_state:
+        st.session_state.preview_quality = 80
+    if 'preview_lossless' not in st.session_state:
+        st.session_state.preview_lossless = False
 
+    # Preview quality (raise it for fine line art such as architectural drawings)
+    st.sidebar.slider("Preview JPEG quality", min_value=50, max_value=95, key="preview_quality")
+    st.sidebar.checkbox("Lossless preview (PNG)", key="preview_lossless")
+    
     # File upload
     uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
     
     if uploaded_file is not None:
-        if st.session_state.uploaded_pdf != uploaded_file:
+        # Identify the upload by content - UploadedFile wrappers compare by identity, not by file.
+        # getbuffer() hashes the upload in place; the bytes are only copied out for a new file
+        file_id = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=16).hexdigest()
+        
+        if st.session_state.file_id != file_id:
             # Reset state for new file
-            st.session_state.uploaded_pdf = uploaded_file
-            st.session_state.split_data = {}
+            st.session_state.file_id = file_id
+            st.session_state.split_data = None
+            st.session_state.active_splits_by_page = {}
             st.session_state.current_page = 0
             st.session_state.slider_positions = [0] * 10
+            # Keep the bytes; every rerun reuses the parsed document
+            st.session_state.pdf_bytes = uploaded_file.getvalue()
+            # Drop handles and spooled copies of previous uploads and trim MuPDF's internal resource store
+            load_fitz_doc.clear()
+            release_pdf_temp_paths(keep=file_id)
+            fitz.TOOLS.store_shrink(100)
         
         try:
-            # Read PDF
-            uploaded_file.seek(0)
-            pdf_reader = PdfReader(uploaded_file)
-            total_pages = len(pdf_reader.pages)
+            # Reuse the document parsed when the file was uploaded
+            doc = load_fitz_doc(file_id, st.session_state.pdf_bytes)
+            total_pages = len(doc)
             
             if total_pages == 0:
                 st.error("The uploaded PDF appears to be empty.")
                 return
             
+            # All slider positions live in one (pages, sliders) array, allocated once per upload
+            if st.session_state.split_data is None:
+                st.session_state.split_data = np.zeros((total_pages, 10), dtype=np.uint8)
+            
             # Ensure current page is within bounds
             if st.session_state.current_page >= total_pages:
                 st.session_state.current_page = total_pages - 1
@@ -137,255 +598,8 @@ def main():
                     st.session_state.current_page += 1
                     st.rerun()
             
-            # Get current page data
-            if current_page_num not in st.session_state.split_data:
-                st.session_state.split_data[current_page_num] = [0] * 10
-            
-            current_splits = st.session_state.split_data[current_page_num]
-            current_page = pdf_reader.pages[current_page_num]
-            
-            # Convert current page to image for display
-            base64_img = get_page_image(pdf_reader, current_page_num)
-            
-            # Create interactive slider interface
-            st.markdown("### Interactive Slider Interface")
-            st.markdown("**Click on the slider bars and use the sliders below to adjust positions**")
-            
-            # Create the interactive HTML with vertical sliders
-            slider_bars_html = ""
-            horizontal_lines_html = ""
-            
-            for i in range(10):
-                slider_value = current_splits[i]
-                left_position = (i * 9) + 5  # Spread sliders evenly (5%, 14%, 23%, etc.)
-                
-                # Create slider bar
-                slider_bars_html += f'''
-                <div class="slider-container" id="slider{i}">
-                    <div class="slider-bar" onclick="selectSlider({i})">
-                        <div class="slider-track"></div>
-                        <div class="slider-handle" style="top: {100 - slider_value}%;">
-                            <div class="handle-label">{i+1}</div>
-                        </div>
-                    </div>
-                </div>
-                '''
-                
-                # Create horizontal line for active sliders
-                if slider_value > 0 and slider_value < 100:
-                    horizontal_lines_html += f'<div class="horizontal-line" style="top: {slider_value}%;"></div>'
-            
-            html_content = f'''
-            <!DOCTYPE html>
-            <html>
-            <head>
-            <style>
-            .preview-container {{
-                position: relative;
-                display: inline-block;
-                border: 2px solid #ccc;
-                margin: 20px 0;
-                background: white;
-            }}
-            .page-image {{
-                max-width: 100%;
-                height: auto;
-                display: block;
-            }}
-            .slider-container {{
-                position: absolute;
-                top: 0;
-                bottom: 0;
-                width: 30px;
-                cursor: pointer;
-                z-index: 10;
-            }}
-            .slider-bar {{
-                position: absolute;
-                top: 10px;
-                bottom: 10px;
-                left: 5px;
-                width: 20px;
-                background: rgba(255, 68, 68, 0.3);
-                border-radius: 10px;
-                border: 2px solid #ff4444;
-            }}
-            .slider-track {{
-                position: absolute;
-                top: 0;
-                bottom: 0;
-                left: 7px;
-                width: 6px;
-                background: #ff4444;
-                border-radius: 3px;
-            }}
-            .slider-handle {{
-                position: absolute;
-                left: -5px;
-                width: 30px;
-                height: 20px;
-                background: #ff4444;
-                border-radius: 10px;
-                cursor: grab;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                transition: all 0.2s;
-            }}
-            .slider-handle:hover {{
-                background: #ff0000;
-                transform: scale(1.1);
-            }}
-            .handle-label {{
-                color: white;
-                font-size: 10px;
-                font-weight: bold;
-            }}
-            .horizontal-line {{
-                position: absolute;
-                left: 0;
-                right: 0;
-                height: 2px;
-                background-color: #ff4444;
-                pointer-events: none;
-                z-index: 5;
-            }}
-            .slider-active {{
-                background: rgba(255, 0, 0, 0.5) !important;
-                border-color: #ff0000 !important;
-            }}
-            </style>
-            </head>
-            <body>
-            <div class="preview-container" id="previewContainer">
-                <img src="data:image/png;base64,{base64_img}" class="page-image" id="pageImage">
-                {horizontal_lines_html}
-                {slider_bars_html}
-            </div>
-            
-            <script>
-            let selectedSlider = null;
-            
-            function selectSlider(sliderIndex) {{
-                selectedSlider = sliderIndex;
-                // Update all slider appearances
-                for (let i = 0; i < 10; i++) {{
-                    const slider = document.getElementById('slider' + i);
-                    if (i === sliderIndex) {{
-                        slider.querySelector('.slider-bar').classList.add('slider-active');
-                    }} else {{
-                        slider.querySelector('.slider-bar').classList.remove('slider-active');
-                    }}
-                }}
-                // Send selection to Streamlit
-                window.parent.postMessage({{
-                    type: 'streamlit:setComponentValue',
-                    value: 'SELECT:' + sliderIndex
-                }}, '*');
-            }}
-            
-            // Initialize slider positions
-            window.addEventListener('load', function() {{
-                // Select first slider by default
-                selectSlider(0);
-            }});
-            </script>
-            </body>
-            </html>
-            '''
-            
-            # Display the interactive preview
-            st.components.v1.html(html_content, height=600)
-            
-            # Slider controls for the selected slider
-            st.markdown("### Adjust Selected Slider")
-            
-            # Get selected slider from session state or default to 0
-            selected_slider = st.session_state.get('selected_slider', 0)
-            
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                st.markdown(f"**Selected: Slider {selected_slider + 1}**")
-                st.markdown(f"Current position: **{current_splits[selected_slider]}%** from top")
-            
-            with col2:
-                # Slider to control the selected slider's position
-                new_value = st.slider(
-                    f"Position for Slider {selected_slider + 1}",
-                    min_value=0,
-                    max_value=100,
-                    value=current_splits[selected_slider],
-                    key=f"slider_control_{current_page_num}",
-                    help="Adjust the vertical position of the selected slider"
-                )
-                
-                # Update the slider position if changed
-                if new_value != current_splits[selected_slider]:
-                    updated_splits = current_splits.copy()
-                    updated_splits[selected_slider] = new_value
-                    st.session_state.split_data[current_page_num] = updated_splits
-                    st.session_state.slider_positions[selected_slider] = new_value
-                    st.rerun()
-            
-            # Handle slider selection from JavaScript
-            js_data = st.components.v1.html("", height=0)
-            if js_data and js_data.startswith('SELECT:'):
-                try:
-                    slider_index = int(js_data.split(':')[1])
-                    st.session_state.selected_slider = slider_index
-                    st.rerun()
-                except:
-                    pass
-            
-            # Display active splits information
-            active_splits = [s for s in current_splits if 0 < s < 100 and s != 0]
-            st.markdown(f"**Active horizontal splits on this page: {len(active_splits)}**")
-            if active_splits:
-                st.write(f"Split positions (from top): {sorted(active_splits)}%")
-                st.write(f"This will create {len(active_splits) + 1} horizontal segments")
-                st.info("💡 **Horizontal splitting**: Each horizontal band becomes a separate page")
-            
-            # Quick position buttons
-            st.markdown("### Quick Positions")
-            col1, col2, col3, col4, col5 = st.columns(5)
-            with col1:
-                if st.button("25%", use_container_width=True) and selected_slider is not None:
-                    updated_splits = current_splits.copy()
-                    updated_splits[selected_slider] = 25
-                    st.session_state.split_data[current_page_num] = updated_splits
-                    st.rerun()
-            with col2:
-                if st.button("50%", use_container_width=True) and selected_slider is not None:
-                    updated_splits = current_splits.copy()
-                    updated_splits[selected_slider] = 50
-                    st.session_state.split_data[current_page_num] = updated_splits
-                    st.rerun()
-            with col3:
-                if st.button("75%", use_container_width=True) and selected_slider is not None:
-                    updated_splits = current_splits.copy()
-                    updated_splits[selected_slider] = 75
-                    st.session_state.split_data[current_page_num] = updated_splits
-                    st.rerun()
-            with col4:
-                if st.button("Reset", use_container_width=True) and selected_slider is not None:
-                    updated_splits = current_splits.copy()
-                    updated_splits[selected_slider] = 0
-                    st.session_state.split_data[current_page_num] = updated_splits
-                    st.rerun()
-            with col5:
-                if st.button("Clear All", use_container_width=True):
-                    st.session_state.split_data[current_page_num] = [0] * 10
-                    st.rerun()
-            
-            # Show split summary for all pages
-            st.markdown("### Split Summary")
-            for page_num in range(total_pages):
-                page_splits = st.session_state.split_data.get(page_num, [0] * 10)
-                active_splits = [s for s in page_splits if 0 < s < 100 and s != 0]
-                segments = len(active_splits) + 1
-                status = "✅" if active_splits else "⏳"
-                current = "📍" if page_num == current_page_num else ""
-                st.write(f"{status} {current} Page {page_num + 1}: {len(active_splits)} splits → {segments} horizontal segments")
+            # Slider edits rerun only this section; navigation, upload and Generate stay untouched
+            page_editor_fragment(file_id, current_page_num)
             
             # Download section
             st.markdown("---")
@@ -394,27 +608,13 @@ def main():
             if st.button("🛠️ Generate Horizontally Split PDF", type="primary", use_container_width=True):
                 with st.spinner("Creating horizontally split PDF..."):
                     try:
-                        # Reset file pointer and recreate reader
-                        uploaded_file.seek(0)
-                        pdf_reader = PdfReader(uploaded_file)
-                        
-                        # Prepare split data (only include active splits)
-                        processed_split_data = {}
-                        for page_num, splits in st.session_state.split_data.items():
-                            active_splits = [s for s in splits if 0 < s < 100 and s != 0]
-                            processed_split_data[page_num] = active_splits
-                        
-                        # Create the split PDF
-                        output_pdf = create_split_pdf(pdf_reader, processed_split_data)
-                        
-                        # Save to bytes
-                        output_buffer = io.BytesIO()
-                        output_pdf.write(output_buffer)
-                        output_buffer.seek(0)
+                        # Active splits are kept up to date by the slider callbacks - no rebuild needed
+                        output_bytes, total_new_pages = create_split_pdf(
+                            st.session_state.pdf_bytes, st.session_state.active_splits_by_page
+                        )
                         
                         # Show success message
-                        total_original_pages = len(pdf_reader.pages)
-                        total_new_pages = len(output_pdf.pages)
+                        total_original_pages = total_pages
                         
                         st.success(f"✅ PDF horizontally split successfully!")
                         st.info(f"Original: {total_original_pages} pages → New: {total_new_pages} pages")
@@ -422,7 +622,7 @@ def main():
                         # Download button
                         st.download_button(
                             label="📥 Download Horizontally Split PDF",
-                            data=output_buffer.getvalue(),
+                            data=output_bytes,
                             file_name="horizontally_split_document.pdf",
                             mime="application/pdf",
                             type="primary",
@@ -431,6 +631,15 @@ def main():
                         
                     except Exception as e:
                         st.error(f"❌ Error generating PDF: {str(e)}")
+            
+            # Queue the neighbouring pages in the render pool without waiting,
+            # so Previous/Next usually find their render already finished
+            for neighbor_page in (current_page_num + 1, current_page_num - 1):
+                if 0 <= neighbor_page < total_pages:
+                    prefetch_page_image(
+                        file_id, st.session_state.pdf_bytes, neighbor_page,
+                        st.session_state.preview_quality, st.session_state.preview_lossless
+                    )
                         
         except Exception as e:
             st.error(f"Error processing PDF: {str(e)}")
@@ -1,6 +1,6 @@
 import streamlit as st
 import fitz  # PyMuPDF
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 import io
 import zipfile
@@ -8,6 +8,11 @@ from pathlib import Path
 import tempfile
 import os
 import time
+import math
+import hashlib
+import itertools
+import functools
+from concurrent.futures import ProcessPoolExecutor
 
 # Try to import reportlab for PDF creation
 try:
@@ -40,96 +45,185 @@ if not REPORTLAB_AVAILABLE:
 if not DOCX_AVAILABLE:
     st.sidebar.warning("⚠️ Word export requires: `pip install python-docx`")
 
-def get_all_page_images(pdf_file, dpi=300):
-    """Extract all pages as high-quality images"""
+# Per-worker document, opened once by the pool initializer
+_WORKER_DOC = None
+
+def _init_render_worker(pdf_bytes):
+    """Open the PDF once in each worker process so pages render without re-sending the file"""
+    global _WORKER_DOC
+    _WORKER_DOC = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _render_page(page_num, dpi):
+    """Render one page of the worker's document as a raw RGB (bytes, size) tuple"""
+    page = _WORKER_DOC[page_num]
+    # Use high DPI for better quality - alpha=False keeps pixmaps at 3 bytes per pixel
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72), alpha=False)
+    
+    # Keep the raw samples - a PNG encode just to decode it again costs more than the render
+    return pix.samples, (pix.width, pix.height)
+
+# Setup previews redraw on every widget change, so they use a lighter render than processing
+PREVIEW_DPI = 100
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _render_all_pages(pdf_digest, _pdf_bytes, dpi=PREVIEW_DPI):
+    """Render every page as raw RGB (bytes, size) tuples - cached on the PDF digest so each file is rasterized once"""
+    with fitz.open(stream=_pdf_bytes, filetype="pdf") as doc:
+        page_count = len(doc)
+    
+    # PyMuPDF is not thread-safe, so pages render in separate processes, each with its own document
+    max_workers = max(1, min(os.cpu_count() or 1, 6, page_count))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker, initargs=(_pdf_bytes,)) as executor:
+        # map keeps page order
+        return list(executor.map(_render_page, range(page_count), itertools.repeat(dpi)))
+
+def get_all_page_images(pdf_digest, pdf_bytes, dpi=PREVIEW_DPI):
+    """Extract all pages as preview images"""
     try:
-        pdf_data = pdf_file.getvalue()
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        page_images = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            # Use high DPI for better quality
-            mat = fitz.Matrix(dpi/72, dpi/72)  # Scale for high resolution
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Use PNG format to preserve quality
-            img_data = pix.tobytes("png")
-            pil_image = Image.open(io.BytesIO(img_data))
-            page_images.append(pil_image)
-        
-        doc.close()
-        return page_images
+        return [Image.frombytes("RGB", size, data) for data, size in _render_all_pages(pdf_digest, pdf_bytes, dpi)]
     except Exception as e:
         st.error(f"Error extracting PDF pages: {str(e)}")
         return []
 
-def create_grid_overlay(image, grid_size=50):
-    """Create a visible grid overlay image with coordinates"""
+def get_page_sizes(pdf_bytes, dpi=300):
+    """Pixel size of every page at the processing DPI - read from the page boxes, nothing is rendered"""
     try:
-        # Create a semi-transparent overlay
-        overlay = Image.new('RGBA', image.size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(overlay)
+        mat = fitz.Matrix(dpi/72, dpi/72)
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            sizes = []
+            for page in doc:
+                # Same rounding as get_pixmap, so coordinates match the processed pages exactly
+                irect = (page.rect * mat).irect
+                sizes.append((irect.width, irect.height))
+            return sizes
+    except Exception as e:
+        st.error(f"Error reading PDF page sizes: {str(e)}")
+        return []
+
+@functools.lru_cache(maxsize=8)
+def _digit_glyphs(text_color):
+    """Rasterize the digits 0-9 once as transparent tiles, with their advance widths"""
+    font = ImageFont.load_default()
+    glyphs = {}
+    for digit in "0123456789":
+        advance = int(round(font.getlength(digit)))
+        tile = Image.new('RGBA', (advance + 1, 14), (0, 0, 0, 0))
+        ImageDraw.Draw(tile).text((0, 0), digit, fill=text_color, font=font)
+        glyphs[digit] = (tile, advance)
+    return glyphs
+
+@functools.lru_cache(maxsize=512)
+def _label_sprite(text, text_color, bg_color):
+    """Assemble a grid coordinate label (background box + digits) from the glyph atlas"""
+    glyphs = _digit_glyphs(text_color)
+    text_width = sum(glyphs[digit][1] for digit in text)
+    label = Image.new('RGBA', (text_width + 5, 16), bg_color)
+    x = 2
+    for digit in text:
+        tile, advance = glyphs[digit]
+        label.alpha_composite(tile, (x, 2))
+        x += advance
+    return label
+
+def create_grid_overlay(image, grid_size=50, grid_opacity=1.0, scale=1.0):
+    """Create a visible grid overlay image with coordinates - labelled in page pixels when the image is a scaled preview"""
+    try:
+        # Bake the opacity into every color's alpha up front - no float pass over the finished overlay
+        def faded(color):
+            return color[:3] + (int(color[3] * grid_opacity),)
         
         # Colors for better visibility
-        grid_color = (0, 100, 255, 180)  # Blue with good opacity
-        text_color = (0, 0, 0, 255)      # Solid black for text
-        center_color = (255, 0, 0, 220)  # Solid red for center lines
-        
-        # Draw vertical lines
-        for x in range(0, image.width, grid_size):
-            draw.line([(x, 0), (x, image.height)], fill=grid_color, width=2)
-            # Add coordinate text at top (with background for readability)
-            text = str(x)
-            bbox = draw.textbbox((0, 0), text)
-            text_width = bbox[2] - bbox[0]
-            draw.rectangle([x, 0, x + text_width + 4, 15], fill=(255, 255, 255, 200))
-            draw.text((x + 2, 2), text, fill=text_color)
-        
-        # Draw horizontal lines
-        for y in range(0, image.height, grid_size):
-            draw.line([(0, y), (image.width, y)], fill=grid_color, width=2)
-            # Add coordinate text at left (with background for readability)
-            text = str(y)
-            bbox = draw.textbbox((0, 0), text)
-            text_width = bbox[2] - bbox[0]
-            draw.rectangle([0, y, text_width + 4, y + 15], fill=(255, 255, 255, 200))
-            draw.text((2, y + 2), text, fill=text_color)
-        
-        # Draw prominent center lines
-        center_x = image.width // 2
-        center_y = image.height // 2
-        draw.line([(center_x, 0), (center_x, image.height)], fill=center_color, width=3)
-        draw.line([(0, center_y), (image.width, center_y)], fill=center_color, width=3)
+        grid_color = faded((0, 100, 255, 180))  # Blue with good opacity
+        text_color = faded((0, 0, 0, 255))      # Solid black for text
+        center_color = faded((255, 0, 0, 220))  # Solid red for center lines
+        label_bg_color = faded((255, 255, 255, 200))
+        
+        # Grid steps in page (processing) pixels, and the image columns/rows they land on
+        page_width = int(round(image.width / scale))
+        page_height = int(round(image.height / scale))
+        grid_xs = np.arange(0, page_width, grid_size)
+        grid_ys = np.arange(0, page_height, grid_size)
+        line_xs = np.minimum(np.round(grid_xs * scale).astype(int), image.width - 1)
+        line_ys = np.minimum(np.round(grid_ys * scale).astype(int), image.height - 1)
+        
+        # Draw all grid lines (2px wide) as slice writes on a transparent buffer
+        grid = np.zeros((image.height, image.width, 4), dtype=np.uint8)
+        grid[:, line_xs] = grid_color
+        grid[:, np.minimum(line_xs + 1, image.width - 1)] = grid_color
+        grid[line_ys, :] = grid_color
+        grid[np.minimum(line_ys + 1, image.height - 1), :] = grid_color
+        
+        # Draw prominent center lines (3px wide)
+        center_x = page_width // 2
+        center_y = page_height // 2
+        line_cx = int(round(center_x * scale))
+        line_cy = int(round(center_y * scale))
+        grid[:, max(line_cx - 1, 0):line_cx + 2] = center_color
+        grid[max(line_cy - 1, 0):line_cy + 2, :] = center_color
+        
+        # Only the centre caption still needs ImageDraw
+        overlay = Image.fromarray(grid, 'RGBA')
+        draw = ImageDraw.Draw(overlay)
+        
+        # On a scaled preview the grid step can be narrower than a label, so only every k-th line
+        # is labelled - k is sized from the widest (last) label plus a small gap, per axis
+        screen_step = max(grid_size * scale, 1e-6)
+        widest_label = _label_sprite(str(grid_xs[-1]), text_color, label_bg_color)
+        label_every_x = max(1, math.ceil((widest_label.width + 2) / screen_step))
+        label_every_y = max(1, math.ceil((widest_label.height + 2) / screen_step))
+        
+        # Add coordinate text at top (with background for readability) - one paste of a cached sprite per label
+        for x, line_x in zip(grid_xs[::label_every_x].tolist(), line_xs[::label_every_x].tolist()):
+            overlay.paste(_label_sprite(str(x), text_color, label_bg_color), (line_x, 0))
+        
+        # Add coordinate text at left (with background for readability)
+        for y, line_y in zip(grid_ys[::label_every_y].tolist(), line_ys[::label_every_y].tolist()):
+            overlay.paste(_label_sprite(str(y), text_color, label_bg_color), (0, line_y))
+        
+        font = ImageFont.load_default()
         
         # Add center coordinates with background
         center_text = f"Center: ({center_x}, {center_y})"
-        bbox = draw.textbbox((0, 0), center_text)
+        bbox = draw.textbbox((0, 0), center_text, font=font)
         text_width = bbox[2] - bbox[0]
-        draw.rectangle([center_x + 5, center_y + 5, center_x + text_width + 10, center_y + 20], 
-                      fill=(255, 255, 255, 230))
-        draw.text((center_x + 7, center_y + 7), center_text, fill=(255, 0, 0, 255))
+        draw.rectangle([line_cx + 5, line_cy + 5, line_cx + text_width + 10, line_cy + 20], 
+                      fill=faded((255, 255, 255, 230)))
+        draw.text((line_cx + 7, line_cy + 7), center_text, fill=faded((255, 0, 0, 255)), font=font)
         
         return overlay
     except Exception as e:
         st.error(f"Error creating grid overlay: {str(e)}")
         return Image.new('RGBA', image.size, (255, 255, 255, 0))
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def gridded_base(pdf_digest, page_index, _page_image, grid_size, grid_opacity, show_grid, scale):
+    """Composite a preview page with its grid once per (page, grid settings) - every call returns a fresh copy"""
+    if not show_grid:
+        return _page_image.convert('RGB')
+    grid_overlay = create_grid_overlay(_page_image, grid_size, grid_opacity, scale)
+    return composite_over_page(_page_image, grid_overlay)
+
+def composite_over_page(page_image, overlay):
+    """Blend an RGBA overlay onto an opaque page with integer math - returns RGB"""
+    # The page has no alpha, so "over" reduces to overlay*a + page*(255-a), no per-pixel division by the result alpha
+    page = np.asarray(page_image.convert('RGB'), dtype=np.uint16)
+    layer = np.asarray(overlay, dtype=np.uint16)
+    alpha = layer[..., 3:]
+    # uint16 is enough: 255*a + 255*(255-a) + 127 < 65536
+    blended = (layer[..., :3] * alpha + page * (255 - alpha) + 127) // 255
+    return Image.fromarray(blended.astype(np.uint8), 'RGB')
+
 def draw_polygon_preview(draw, points, color, label):
     """Draw polygon with label and vertex markers"""
     try:
         if len(points) < 2:
             return
         
-        # Draw polygon outline
+        # Draw polygon outline - one pass covers every edge, including the closing one
         if len(points) >= 3:
             draw.polygon(points, outline=color, width=3)
-        
-        # Draw connecting lines
-        for i in range(len(points)):
-            start_point = points[i]
-            end_point = points[(i + 1) % len(points)]
-            draw.line([start_point, end_point], fill=color, width=2)
+        else:
+            draw.line(points, fill=color, width=2)
         
         # Draw vertex points and numbers
         for i, (x, y) in enumerate(points):
@@ -145,14 +239,18 @@ def draw_polygon_preview(draw, points, color, label):
     except Exception as e:
         st.error(f"Error drawing polygon preview: {str(e)}")
 
-def visual_logo_selection(image, logo_states):
+def visual_logo_selection(page_size, logo_states):
     """Visual logo selection with interactive coordinate selection"""
     try:
+        # Coordinates stay in processing (300 DPI) pixels; only the drawing happens on the light preview
+        page_width, page_height = page_size
+        preview_page = st.session_state.preview_images[0]
+        page_index = 0
         st.subheader("🎯 Logo Area Setup (6 Boxes: 4 Rectangle + 2 Polygon)")
         
         # Page selection for visual reference
-        if 'all_page_images' in st.session_state:
-            page_options = list(range(1, len(st.session_state.all_page_images) + 1))
+        if 'page_sizes' in st.session_state:
+            page_options = list(range(1, len(st.session_state.page_sizes) + 1))
             selected_page = st.selectbox(
                 "Select Page for Visual Reference:",
                 page_options,
@@ -161,8 +259,10 @@ def visual_logo_selection(image, logo_states):
             )
             
             # Update image to selected page
-            image = st.session_state.all_page_images[selected_page - 1]
-            st.info(f"📄 Using Page {selected_page} for reference. Logo coordinates will apply to all {len(st.session_state.all_page_images)} pages.")
+            page_width, page_height = st.session_state.page_sizes[selected_page - 1]
+            preview_page = st.session_state.preview_images[selected_page - 1]
+            page_index = selected_page - 1
+            st.info(f"📄 Using Page {selected_page} for reference. Logo coordinates will apply to all {len(st.session_state.page_sizes)} pages.")
         
         # Grid settings
         st.subheader("🗺️ Grid Settings")
@@ -176,18 +276,15 @@ def visual_logo_selection(image, logo_states):
             grid_opacity = st.slider("Grid Opacity", min_value=50, max_value=100, value=80,
                                     help="Grid visibility level") / 100.0
         
-        # Create display image with optional grid
-        display_img = image.copy().convert('RGBA')
-        if show_grid:
-            grid_overlay = create_grid_overlay(image, grid_size)
-            # Adjust opacity
-            if grid_opacity < 1.0:
-                grid_overlay = grid_overlay.convert('RGBA')
-                data = np.array(grid_overlay)
-                data[..., 3] = (data[..., 3] * grid_opacity).astype(np.uint8)
-                grid_overlay = Image.fromarray(data)
-            
-            display_img = Image.alpha_composite(display_img, grid_overlay)
+        # Scale from processing pixels to preview pixels
+        scale = preview_page.width / page_width
+        
+        def to_preview(point):
+            return tuple(int(round(v * scale)) for v in point)
+        
+        # Create display image with optional grid - composited once per page and grid setting
+        display_img = gridded_base(st.session_state.get('pdf_digest'), page_index, preview_page,
+                                   grid_size, grid_opacity, show_grid, scale)
         
         # Display the reference image
         st.image(display_img, caption="Reference Image with Grid - Click buttons below to set logo areas", use_column_width=True)
@@ -204,13 +301,13 @@ def visual_logo_selection(image, logo_states):
                 click_points = {"x1": 10, "y1": 10, "x2": 110, "y2": 60}
         with point_cols[1]:
             if st.button("📍 Top-Right Area", use_container_width=True):
-                click_points = {"x1": image.width-120, "y1": 10, "x2": image.width-20, "y2": 60}
+                click_points = {"x1": page_width-120, "y1": 10, "x2": page_width-20, "y2": 60}
         with point_cols[2]:
             if st.button("📍 Bottom-Left Area", use_container_width=True):
-                click_points = {"x1": 10, "y1": image.height-70, "x2": 110, "y2": image.height-20}
+                click_points = {"x1": 10, "y1": page_height-70, "x2": 110, "y2": page_height-20}
         with point_cols[3]:
             if st.button("📍 Bottom-Right Area", use_container_width=True):
-                click_points = {"x1": image.width-120, "y1": image.height-70, "x2": image.width-20, "y2": image.height-20}
+                click_points = {"x1": page_width-120, "y1": page_height-70, "x2": page_width-20, "y2": page_height-20}
         
         # Apply clicked points to Logo 1
         if click_points and not st.session_state.get('logo1_coords'):
@@ -257,22 +354,22 @@ def visual_logo_selection(image, logo_states):
                         
                         with cols[0]:
                             x1 = st.number_input(f"Left (X1)", 
-                                               min_value=0, max_value=image.width,
+                                               min_value=0, max_value=page_width,
                                                value=logo_states[f'logo{i}_coords'][0] if logo_states[f'logo{i}_coords'] else 50 + (i-1)*30,
                                                key=f"logo{i}_x1")
                         with cols[1]:
                             y1 = st.number_input(f"Top (Y1)", 
-                                               min_value=0, max_value=image.height,
+                                               min_value=0, max_value=page_height,
                                                value=logo_states[f'logo{i}_coords'][1] if logo_states[f'logo{i}_coords'] else 50 + (i-1)*40,
                                                key=f"logo{i}_y1")
                         with cols[2]:
                             x2 = st.number_input(f"Right (X2)", 
-                                               min_value=0, max_value=image.width,
+                                               min_value=0, max_value=page_width,
                                                value=logo_states[f'logo{i}_coords'][2] if logo_states[f'logo{i}_coords'] else 150 + (i-1)*30,
                                                key=f"logo{i}_x2")
                         with cols[3]:
                             y2 = st.number_input(f"Bottom (Y2)", 
-                                               min_value=0, max_value=image.height,
+                                               min_value=0, max_value=page_height,
                                                value=logo_states[f'logo{i}_coords'][3] if logo_states[f'logo{i}_coords'] else 100 + (i-1)*40,
                                                key=f"logo{i}_y2")
                         
@@ -305,11 +402,11 @@ def visual_logo_selection(image, logo_states):
                             with point_cols[col_idx]:
                                 st.markdown(f"**Point {point_idx + 1}**")
                                 x = st.number_input(f"X{point_idx + 1}", 
-                                                  min_value=0, max_value=image.width,
+                                                  min_value=0, max_value=page_width,
                                                   value=100 + point_idx * 20,
                                                   key=f"polygon{i}_point{point_idx}_x")
                                 y = st.number_input(f"Y{point_idx + 1}", 
-                                                  min_value=0, max_value=image.height,
+                                                  min_value=0, max_value=page_height,
                                                   value=100 + point_idx * 15,
                                                   key=f"polygon{i}_point{point_idx}_y")
                                 polygon_points.append((x, y))
@@ -323,18 +420,9 @@ def visual_logo_selection(image, logo_states):
         # Real-time Preview Section
         st.subheader("👁️ Live Preview")
         
-        # Create preview image with grid
-        preview_img = image.copy().convert('RGBA')
-        if show_grid:
-            grid_overlay = create_grid_overlay(image, grid_size)
-            # Adjust opacity
-            if grid_opacity < 1.0:
-                grid_overlay = grid_overlay.convert('RGBA')
-                data = np.array(grid_overlay)
-                data[..., 3] = (data[..., 3] * grid_opacity).astype(np.uint8)
-                grid_overlay = Image.fromarray(data)
-            
-            preview_img = Image.alpha_composite(preview_img, grid_overlay)
+        # Create preview image with grid - a fresh copy of the cached base, so coordinate edits only redraw the boxes
+        preview_img = gridded_base(st.session_state.get('pdf_digest'), page_index, preview_page,
+                                   grid_size, grid_opacity, show_grid, scale)
         
         draw = ImageDraw.Draw(preview_img)
         
@@ -342,7 +430,9 @@ def visual_logo_selection(image, logo_states):
         for i in range(1, 7):
             if logo_enabled[i] and logo_coords.get(i):
                 if logo_types[i] == "rectangle":
-                    x1, y1, x2, y2 = logo_coords[i]
+                    # Sizes are reported in processing pixels, the box is drawn on the preview
+                    size_text = f"{logo_coords[i][2]-logo_coords[i][0]}×{logo_coords[i][3]-logo_coords[i][1]}"
+                    x1, y1, x2, y2 = to_preview(logo_coords[i])
                     # Draw rectangle box with thick border
                     draw.rectangle([x1, y1, x2, y2], outline=colors[i-1], width=4)
                     # Add label with background
@@ -352,7 +442,6 @@ def visual_logo_selection(image, logo_states):
                     draw.rectangle([x1, y1-30, x1 + text_width + 6, y1-10], fill=(255, 255, 255, 200))
                     draw.text((x1+3, y1-28), label, fill=colors[i-1])
                     # Add size info with background
-                    size_text = f"{x2-x1}×{y2-y1}"
                     bbox = draw.textbbox((0, 0), size_text)
                     text_width = bbox[2] - bbox[0]
                     draw.rectangle([x1, y2+2, x1 + text_width + 6, y2+22], fill=(255, 255, 255, 200))
@@ -360,7 +449,7 @@ def visual_logo_selection(image, logo_states):
                     active_logos.append(f"Logo {i} (Rect)")
                     
                 else:  # polygon
-                    points = logo_coords[i]
+                    points = [to_preview(point) for point in logo_coords[i]]
                     if len(points) >= 3:
                         draw_polygon_preview(draw, points, colors[i-1], f"LOGO {i}")
                         active_logos.append(f"Logo {i} (Polygon)")
@@ -404,7 +493,7 @@ def visual_logo_selection(image, logo_states):
             
             with action_cols[2]:
                 if st.button("🎯 Auto-Space Logos", use_container_width=True):
-                    img_w, img_h = image.width, image.height
+                    img_w, img_h = page_width, page_height
                     logo_width, logo_height = 100, 50
                     spacing_x = (img_w - (4 * logo_width)) // 5
                     spacing_y = (img_h - logo_height) // 2
@@ -446,6 +535,13 @@ def visual_logo_selection(image, logo_states):
         st.error(f"Error in logo selection: {str(e)}")
         return False
 
+@functools.lru_cache(maxsize=8)
+def polygon_mask(points, size):
+    """Rasterize a polygon once into an 'L' mask for a page of the given (width, height)"""
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).polygon(points, fill=255)
+    return mask
+
 def remove_logo_precise(image, logo_coords, logo_type, method="white"):
     """Remove logo with precise coordinates - supports both rectangle and polygon"""
     if logo_coords is None:
@@ -502,12 +598,9 @@ def remove_logo_precise(image, logo_coords, logo_type, method="white"):
     else:  # polygon
         points = logo_coords
         if len(points) >= 3:
-            if method == "white":
-                # Simple white fill for polygon
-                draw.polygon(points, fill=(255, 255, 255))
-            else:
-                # For polygons, use white fill (smart fill is complex for polygons)
-                draw.polygon(points, fill=(255, 255, 255))
+            # Same polygon on every page, so rasterize it once and stamp the cached mask
+            # (white fill for both methods - smart fill is complex for polygons)
+            result_img.paste((255, 255, 255), mask=polygon_mask(tuple(map(tuple, points)), image.size))
     
     return result_img
 
@@ -598,18 +691,17 @@ def process_pdf_with_logos(pdf_file, logo_states, white_threshold, removal_metho
     
     start_time = time.time()
     
-    for page_num in range(total_pages):
+    # Use high DPI for processing to maintain quality
+    mat = fitz.Matrix(300/72, 300/72)  # High resolution processing, built once for all pages
+    
+    for page_num, page in enumerate(doc):
         # Update main progress
         main_progress.progress((page_num) / total_pages, text=f"🔄 Processing page {page_num + 1}/{total_pages}")
         
-        page = doc[page_num]
-        # Use high DPI for processing to maintain quality
-        mat = fitz.Matrix(300/72, 300/72)  # High resolution processing
-        pix = page.get_pixmap(matrix=mat)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
         
-        # Use PNG format to preserve quality
-        img_data = pix.tobytes("png")
-        pil_image = Image.open(io.BytesIO(img_data))
+        # Raw RGB samples are lossless already - skip the PNG encode/decode round-trip
+        pil_image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
         
         # Step 1: Logo Removal (all 6 logos)
         sub_progress.progress(0.2, text=f"Removing logos...")
@@ -905,8 +997,10 @@ for i in range(1, 7):
         st.session_state[f'logo{i}_coords'] = None
     if f'logo{i}_type' not in st.session_state:
         st.session_state[f'logo{i}_type'] = "rectangle" if i <= 4 else "polygon"
-if 'all_page_images' not in st.session_state:
-    st.session_state.all_page_images = None
+if 'page_sizes' not in st.session_state:
+    st.session_state.page_sizes = None
+if 'preview_images' not in st.session_state:
+    st.session_state.preview_images = None
 
 # Main App Flow
 st.sidebar.header("⚙️ PDF Image Processor 1.3")
@@ -945,10 +1039,19 @@ if DOCX_AVAILABLE:
 if uploaded_pdf:
     st.sidebar.success("✅ PDF uploaded successfully!")
     
-    # Extract all pages for logo setup with high quality
-    if st.session_state.all_page_images is None:
-        with st.spinner("Loading PDF pages with high quality..."):
-            st.session_state.all_page_images = get_all_page_images(uploaded_pdf, dpi=300)
+    # Read the upload once per file; a new file needs fresh page images
+    if st.session_state.get('pdf_file_id') != uploaded_pdf.file_id:
+        st.session_state.pdf_file_id = uploaded_pdf.file_id
+        st.session_state.pdf_bytes = uploaded_pdf.getvalue()
+        # Content key for the render cache, so re-uploading the same file skips rasterization
+        st.session_state.pdf_digest = hashlib.blake2b(st.session_state.pdf_bytes, digest_size=8).hexdigest()
+        st.session_state.page_sizes = None
+    
+    # Light preview renders for logo setup; 300 DPI pages are only rendered while processing
+    if st.session_state.page_sizes is None:
+        with st.spinner("Loading PDF pages..."):
+            st.session_state.page_sizes = get_page_sizes(st.session_state.pdf_bytes, dpi=300)
+            st.session_state.preview_images = get_all_page_images(st.session_state.pdf_digest, st.session_state.pdf_bytes, dpi=PREVIEW_DPI)
     
     # Step 1: Logo Setup
     st.sidebar.subheader("2. Logo Setup")
@@ -998,10 +1101,10 @@ if uploaded_pdf:
             logo_states[f'logo{i}_type'] = st.session_state[f'logo{i}_type']
         
         # Get first page for reference
-        first_page_img = st.session_state.all_page_images[0]
+        first_page_size = st.session_state.page_sizes[0]
         
         # Visual logo setup
-        visual_logo_selection(first_page_img, logo_states)
+        visual_logo_selection(first_page_size, logo_states)
     
     # Step 3: Process PDF
     any_logo_enabled = any(st.session_state.get(f'logo{i}_enabled', False) for i in range(1, 7))
@@ -1018,7 +1121,7 @@ if uploaded_pdf:
                     logo_summary.append(f"Logo {i} ({type_label})")
             
             if logo_summary:
-                st.info(f"🔧 Will remove: {', '.join(logo_summary)} from all {len(st.session_state.all_page_images)} pages")
+                st.info(f"🔧 Will remove: {', '.join(logo_summary)} from all {len(st.session_state.page_sizes)} pages")
         
         # Show cropping info
         st.info(f"🌐 Cropping: **{cropping_method.upper()}** direction{'s' if cropping_method == 'both' else ''}")
@@ -1071,7 +1174,7 @@ if uploaded_pdf:
         # Show before/after comparison
         if any_logo_enabled:
             st.subheader("Before/After Comparison")
-            original_first_page = st.session_state.all_page_images[0]
+            original_first_page = st.session_state.preview_images[0]
             processed_first_page = st.session_state.processed_images[0]
             
             col1, col2 = st.columns(2)
@@ -1096,7 +1199,8 @@ if uploaded_pdf:
         with cols[col_index]:
             # ZIP download
             zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+            # PNG is already DEFLATE-compressed, so STORED skips a pointless second pass
+            with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
                 for i, img in enumerate(st.session_state.processed_images):
                     img_bytes = io.BytesIO()
                     img.save(img_bytes, format='PNG')  # Use PNG for quality
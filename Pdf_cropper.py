@@ -1,5 +1,7 @@
 import streamlit as st
 import fitz  # PyMuPDF
+# Works with vanilla Pillow or the drop-in Pillow-SIMD build (see requirements.txt) - keep SIMD installed when deploying
+import PIL
 from PIL import Image, ImageDraw
 import numpy as np
 import io
@@ -8,15 +10,11 @@ from pathlib import Path
 import tempfile
 import os
 import time
-
-# Try to import reportlab for PDF creation
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib.utils import ImageReader
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+import atexit
+import functools
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 # Try to import python-docx, but make it optional
 try:
@@ -30,290 +28,459 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
+# Try to import pyvips (libvips), but make it optional - PyMuPDF renders when it is missing
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    PYVIPS_AVAILABLE = False
+
+# Try to import Numba, but make it optional - the NumPy crop path is used without it
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 st.set_page_config(page_title="PDF Image Processor 1.3", layout="wide")
 
 st.title("🔄 PDF Image Processor 1.3")
 st.markdown("**High-Quality Visual Logo Selection + Freeform Polygon + Both-Direction Cropping**")
 
-if not REPORTLAB_AVAILABLE:
-    st.sidebar.warning("⚠️ PDF export requires: `pip install reportlab`")
 if not DOCX_AVAILABLE:
     st.sidebar.warning("⚠️ Word export requires: `pip install python-docx`")
 
+# Render zoom per quality level (1.0 = 72 DPI) - used for processing only
+QUALITY_ZOOM = {"standard": 1.0, "high": 2.0, "maximum": 3.0}
+
+# Logo-setup previews are rendered to this width; logo coordinates are read off this grid
+PREVIEW_MAX_WIDTH = 800
+
+# JPEG quality for photographic pages in the ZIP and PDF exports
+PAGE_JPEG_QUALITY = 90
+
+# Pages added to the output PDF between incremental saves to disk
+OUTPUT_SPOOL_PAGES = 16
+
+# Share of unique colours in a downsampled page above which it is treated as a photo (JPEG)
+PHOTO_COLOR_RATIO = 0.25
+
 # Initialize session state
-if 'all_page_images' not in st.session_state:
-    st.session_state.all_page_images = None
-if 'processed_images' not in st.session_state:
-    st.session_state.processed_images = None
+if 'processed_pdf_path' not in st.session_state:
+    st.session_state.processed_pdf_path = None
+if 'processed_zip_path' not in st.session_state:
+    st.session_state.processed_zip_path = None
 if 'logo_states' not in st.session_state:
     st.session_state.logo_states = {}
 
-def get_all_page_images(pdf_file):
-    """Extract all pages as images for logo setup - HIGH QUALITY"""
+def pixmap_to_array(pix):
+    """View a PyMuPDF pixmap's samples as an HxWxN uint8 array - zero-copy, valid while the pixmap lives"""
+    return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+def _render_page_vips(pdf_bytes, page_index, zoom):
+    """Render one page through libvips pdfload as a raw RGB buffer"""
+    img = pyvips.Image.pdfload_buffer(pdf_bytes, page=page_index, n=1, dpi=72 * zoom, access="sequential")
+    # pdfload renders RGBA; flatten onto white so pages match the PyMuPDF RGB path
+    if img.hasalpha():
+        img = img.flatten(background=[255, 255, 255]).cast("uchar")
+    return img.write_to_memory(), (img.width, img.height), "RGB"
+
+def preview_scale(page, max_width=PREVIEW_MAX_WIDTH):
+    """Zoom that renders a page at the preview width (1.0 = 72 DPI)"""
+    return max_width / page.rect.width
+
+@st.cache_resource(max_entries=2)
+def load_fitz_doc(pdf_digest, _pdf_bytes):
+    """Open the uploaded PDF once per file for preview rendering"""
+    return fitz.open(stream=_pdf_bytes, filetype="pdf")
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _render_preview_page(pdf_digest, _pdf_bytes, page_index, max_width=PREVIEW_MAX_WIDTH):
+    """Render a single preview page as a raw (bytes, size, mode) tuple - only the pages actually viewed are kept"""
+    page = load_fitz_doc(pdf_digest, _pdf_bytes)[page_index]
+    # Pixel count grows with zoom², so previews only render as wide as they are shown
+    zoom = preview_scale(page, max_width)
+    
+    if PYVIPS_AVAILABLE:
+        try:
+            return _render_page_vips(_pdf_bytes, page_index, zoom)
+        except pyvips.Error:
+            pass  # e.g. libvips built without poppler/pdfium - fall back to PyMuPDF
+    
+    # MuPDF converts CMYK/gray pages to RGB itself, so every pixmap has n == 3
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+    # samples is the one copy of the raw RGB buffer the cache needs - no PIL wrapper in between
+    return pix.samples, (pix.width, pix.height), "RGB"
+
+def get_preview_image(pdf_digest, pdf_bytes, page_index):
+    """Render one page as a low-resolution image for logo setup - full resolution is only rendered when processing"""
     try:
-        pdf_data = pdf_file.getvalue()
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        page_images = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            # Increase DPI for better quality (300 DPI instead of default 72)
-            mat = fitz.Matrix(2.0, 2.0)  # 2x zoom = ~144 DPI, 3x = ~216 DPI, 4x = ~288 DPI
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to RGB if needed
-            if pix.n < 4:  # grayscale or RGB
-                img_data = pix.tobytes("ppm")
-            else:  # CMYK or other
-                img_data = pix.tobytes("png")
-                
-            pil_image = Image.open(io.BytesIO(img_data))
-            page_images.append(pil_image)
-        
-        doc.close()
-        return page_images
+        data, size, mode = _render_preview_page(pdf_digest, pdf_bytes, page_index)
+        return Image.frombytes(mode, size, data)
     except Exception as e:
-        st.error(f"Error extracting PDF pages: {str(e)}")
-        return []
+        st.error(f"Error extracting PDF page: {str(e)}")
+        return None
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _grid_for_size(width, height, grid_size=50):
+    """Draw the coordinate grid for one page size as raw (RGB, alpha) bytes - it depends on nothing else"""
+    # Colors for better visibility
+    grid_color = (0, 100, 255, 180)  # Blue with good opacity
+    text_color = (0, 0, 0, 255)      # Solid black for text
+    center_color = (255, 0, 0, 220)  # Solid red for center lines
+    
+    # Draw all grid lines (2px wide) as strided slice assignments on a transparent buffer
+    grid = np.zeros((height, width, 4), dtype=np.uint8)
+    grid[:, 0::grid_size] = grid_color
+    grid[:, 1::grid_size] = grid_color
+    grid[0::grid_size, :] = grid_color
+    grid[1::grid_size, :] = grid_color
+    
+    # Draw prominent center lines (3px wide)
+    center_x = width // 2
+    center_y = height // 2
+    grid[:, max(center_x - 1, 0):center_x + 2] = center_color
+    grid[max(center_y - 1, 0):center_y + 2, :] = center_color
+    
+    overlay = Image.fromarray(grid)
+    draw = ImageDraw.Draw(overlay)
+    
+    # Add coordinate text at top (with background for readability)
+    for x in range(0, width, grid_size):
+        text = str(x)
+        bbox = draw.textbbox((0, 0), text)
+        text_width = bbox[2] - bbox[0]
+        draw.rectangle([x, 0, x + text_width + 4, 15], fill=(255, 255, 255, 200))
+        draw.text((x + 2, 2), text, fill=text_color)
+    
+    # Add coordinate text at left (with background for readability)
+    for y in range(0, height, grid_size):
+        text = str(y)
+        bbox = draw.textbbox((0, 0), text)
+        text_width = bbox[2] - bbox[0]
+        draw.rectangle([0, y, text_width + 4, y + 15], fill=(255, 255, 255, 200))
+        draw.text((2, y + 2), text, fill=text_color)
+    
+    # Add center coordinates with background
+    center_text = f"Center: ({center_x}, {center_y})"
+    bbox = draw.textbbox((0, 0), center_text)
+    text_width = bbox[2] - bbox[0]
+    draw.rectangle([center_x + 5, center_y + 5, center_x + text_width + 10, center_y + 20], 
+                  fill=(255, 255, 255, 230))
+    draw.text((center_x + 7, center_y + 7), center_text, fill=(255, 0, 0, 255))
+    
+    # Split once here so each preview is a single masked paste onto the RGB page
+    return overlay.convert('RGB').tobytes(), overlay.getchannel('A').tobytes()
 
 def create_grid_overlay(image, grid_size=50):
-    """Create a visible grid overlay image with coordinates"""
+    """Create a visible grid overlay with coordinates as (RGB layer, alpha mask) - drawn once per page size"""
     try:
-        # Create a semi-transparent overlay
-        overlay = Image.new('RGBA', image.size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(overlay)
-        
-        # Colors for better visibility
-        grid_color = (0, 100, 255, 180)  # Blue with good opacity
-        text_color = (0, 0, 0, 255)      # Solid black for text
-        center_color = (255, 0, 0, 220)  # Solid red for center lines
-        
-        # Draw vertical lines
-        for x in range(0, image.width, grid_size):
-            draw.line([(x, 0), (x, image.height)], fill=grid_color, width=2)
-            # Add coordinate text at top (with background for readability)
-            text = str(x)
-            bbox = draw.textbbox((0, 0), text)
-            text_width = bbox[2] - bbox[0]
-            draw.rectangle([x, 0, x + text_width + 4, 15], fill=(255, 255, 255, 200))
-            draw.text((x + 2, 2), text, fill=text_color)
-        
-        # Draw horizontal lines
-        for y in range(0, image.height, grid_size):
-            draw.line([(0, y), (image.width, y)], fill=grid_color, width=2)
-            # Add coordinate text at left (with background for readability)
-            text = str(y)
-            bbox = draw.textbbox((0, 0), text)
-            text_width = bbox[2] - bbox[0]
-            draw.rectangle([0, y, text_width + 4, y + 15], fill=(255, 255, 255, 200))
-            draw.text((2, y + 2), text, fill=text_color)
-        
-        # Draw prominent center lines
-        center_x = image.width // 2
-        center_y = image.height // 2
-        draw.line([(center_x, 0), (center_x, image.height)], fill=center_color, width=3)
-        draw.line([(0, center_y), (image.width, center_y)], fill=center_color, width=3)
-        
-        # Add center coordinates with background
-        center_text = f"Center: ({center_x}, {center_y})"
-        bbox = draw.textbbox((0, 0), center_text)
-        text_width = bbox[2] - bbox[0]
-        draw.rectangle([center_x + 5, center_y + 5, center_x + text_width + 10, center_y + 20], 
-                      fill=(255, 255, 255, 230))
-        draw.text((center_x + 7, center_y + 7), center_text, fill=(255, 0, 0, 255))
-        
-        return overlay
+        rgb_bytes, alpha_bytes = _grid_for_size(image.width, image.height, grid_size)
+        return Image.frombytes('RGB', image.size, rgb_bytes), Image.frombytes('L', image.size, alpha_bytes)
     except Exception as e:
         st.error(f"Error creating grid overlay: {str(e)}")
-        return Image.new('RGBA', image.size, (255, 255, 255, 0))
+        return Image.new('RGB', image.size), Image.new('L', image.size, 0)
 
-def remove_logo_precise(image, coords, logo_type="rectangle", method="white"):
-    """Remove logo from image using specified coordinates and method"""
-    try:
-        img_array = np.array(image)
-        
-        if logo_type == "rectangle":
-            x1, y1, x2, y2 = coords
-            if method == "white":
-                img_array[y1:y2, x1:x2] = 255  # White fill
-            else:  # smart fill
-                # Simple smart fill - extend background color
-                # For now, just use white as placeholder
-                img_array[y1:y2, x1:x2] = 255
-        # Add other logo types (polygon, etc.) here
-        
-        return Image.fromarray(img_array)
-    except Exception as e:
-        st.error(f"Error removing logo: {str(e)}")
-        return image
+# ITU-R 601-2 luma weights scaled by 256, so grayscale stays in integer math
+LUMA_WEIGHTS = np.array([77, 150, 29], dtype=np.uint16)
+
+def _grayscale(img_array):
+    """Integer luma of a page array (same weights as PIL's convert('L')) as uint8 - no float blow-up"""
+    if img_array.ndim == 2:
+        return img_array
+    return ((img_array[..., :3] @ LUMA_WEIGHTS) >> 8).astype(np.uint8)
+
+def _content_span(profile, white_threshold):
+    """Return (first, last) indices of the non-white entries of a row/column min profile, or None"""
+    non_white = profile < white_threshold
+    if not non_white.any():
+        return None
+    first = int(np.argmax(non_white))
+    last = len(non_white) - 1 - int(np.argmax(non_white[::-1]))
+    return first, last
+
+if NUMBA_AVAILABLE:
+    # Serial and cached on disk - pages already run one per pool worker, and each worker loads the compiled kernel
+    @njit(cache=True)
+    def content_bbox(rgb, white_threshold):
+        """Fused luma + threshold + bbox scan over an HxWx3 page - returns (-1, ...) if blank"""
+        height, width = rgb.shape[0], rgb.shape[1]
+        top, bottom, left, right = -1, -1, width, -1
+        
+        for y in range(height):
+            # Scan in from each edge and stop at the first dark pixel - content rows only touch their margins
+            row_left = -1
+            for x in range(width):
+                if (77 * rgb[y, x, 0] + 150 * rgb[y, x, 1] + 29 * rgb[y, x, 2]) >> 8 < white_threshold:
+                    row_left = x
+                    break
+            if row_left < 0:
+                continue
+            row_right = row_left
+            for x in range(width - 1, row_left, -1):
+                if (77 * rgb[y, x, 0] + 150 * rgb[y, x, 1] + 29 * rgb[y, x, 2]) >> 8 < white_threshold:
+                    row_right = x
+                    break
+            
+            if top < 0:
+                top = y
+            bottom = y
+            left = min(left, row_left)
+            right = max(right, row_right)
+        return top, bottom, left, right
 
-def crop_vertical_only(image, white_threshold=245):
-    """Crop only top and bottom white space"""
+def crop_vertical_only(img_array, white_threshold=245):
+    """Crop only top and bottom white space - returns a view of the page array"""
     try:
-        img_array = np.array(image.convert('L'))  # Convert to grayscale
-        
-        # Find rows that are not white
-        non_white_rows = np.where(np.mean(img_array, axis=1) < white_threshold)[0]
-        if len(non_white_rows) > 0:
-            top = non_white_rows[0]
-            bottom = non_white_rows[-1]
+        # Find rows with any pixel darker than the threshold
+        span = _content_span(_grayscale(img_array).min(axis=1), white_threshold)
+        if span:
+            top, bottom = span
             # Keep original width, crop height
-            return image.crop((0, top, image.width, bottom + 1))
-        return image
+            return img_array[top:bottom + 1]
+        return img_array
     except Exception as e:
         st.error(f"Error in vertical cropping: {str(e)}")
-        return image
+        return img_array
 
-def crop_horizontal_only(image, white_threshold=245):
-    """Crop only left and right white space"""
+def crop_horizontal_only(img_array, white_threshold=245):
+    """Crop only left and right white space - returns a view of the page array"""
     try:
-        img_array = np.array(image.convert('L'))  # Convert to grayscale
-        
-        # Find columns that are not white
-        non_white_cols = np.where(np.mean(img_array, axis=0) < white_threshold)[0]
-        if len(non_white_cols) > 0:
-            left = non_white_cols[0]
-            right = non_white_cols[-1]
+        # Find columns with any pixel darker than the threshold
+        span = _content_span(_grayscale(img_array).min(axis=0), white_threshold)
+        if span:
+            left, right = span
             # Keep original height, crop width
-            return image.crop((left, 0, right + 1, image.height))
-        return image
+            return img_array[:, left:right + 1]
+        return img_array
     except Exception as e:
         st.error(f"Error in horizontal cropping: {str(e)}")
-        return image
+        return img_array
 
-def crop_both_fixed(image, white_threshold=245):
-    """Crop both vertical and horizontal white space"""
+def crop_both_fixed(img_array, white_threshold=245):
+    """Crop both vertical and horizontal white space - returns a view of the page array"""
     try:
-        # First crop vertically
-        img_vert = crop_vertical_only(image, white_threshold)
-        # Then crop horizontally
-        img_both = crop_horizontal_only(img_vert, white_threshold)
-        return img_both
+        # One compiled pass over the RGB buffer finds all four edges
+        if NUMBA_AVAILABLE and img_array.ndim == 3:
+            top, bottom, left, right = content_bbox(img_array, int(white_threshold))
+            if top < 0:
+                return img_array
+            return img_array[top:bottom + 1, left:right + 1]
+        
+        # Single grayscale pass shared by both directions
+        gray = _grayscale(img_array)
+        
+        # First find the content rows
+        row_span = _content_span(gray.min(axis=1), white_threshold)
+        if not row_span:
+            return img_array
+        top, bottom = row_span
+        
+        # Then the content columns within those rows
+        col_span = _content_span(gray[top:bottom + 1].min(axis=0), white_threshold)
+        if col_span:
+            left, right = col_span
+        else:
+            left, right = 0, img_array.shape[1] - 1
+        
+        return img_array[top:bottom + 1, left:right + 1]
     except Exception as e:
         st.error(f"Error in both-direction cropping: {str(e)}")
-        return image
+        return img_array
 
-def process_pdf_with_logos(pdf_file, logo_states, white_threshold, removal_method, cropping_method, main_progress, sub_progress, time_tracker):
-    """Process all pages with logo removal and cropping with HIGH QUALITY"""
-    processed_images = []
+def enabled_logo_rects(logo_states):
+    """Pack the coordinates of all enabled rectangle logos into one (N, 4) int32 array of x1, y1, x2, y2"""
+    states = [logo_states.get(f'logo{i}', {}) for i in range(1, 7)]
+    enabled = np.array([
+        bool(state.get('enabled', False) and state.get('coords') and state.get('type', 'rectangle') == "rectangle")
+        for state in states
+    ], dtype=bool)
+    coords = np.array([state['coords'] if on else (0, 0, 0, 0) for state, on in zip(states, enabled)], dtype=np.int32)
+    return coords[enabled]
+
+@functools.lru_cache(maxsize=8)
+def logo_mask(rects_key, shape):
+    """Flatten all logo rectangles (an int32 array's bytes) into a single boolean stamp for a page of the given (height, width)"""
+    mask = np.zeros(shape, dtype=bool)
+    for x1, y1, x2, y2 in np.frombuffer(rects_key, dtype=np.int32).reshape(-1, 4).tolist():
+        mask[y1:y2, x1:x2] = True
+    return mask
+
+def _process_one_page(img_array, logo_rects, white_threshold, cropping_method):
+    """Remove logos from and crop a single rendered page array - returns (encoded bytes, extension, size)"""
+    # It stays a NumPy array from here until the final encode - crops are just slices.
     
-    pdf_data = pdf_file.getvalue()
-    doc = fitz.open(stream=pdf_data, filetype="pdf")
-    total_pages = len(doc)
+    # Step 1: Logo Removal - all enabled logos stamped in one assignment
+    if len(logo_rects):
+        # White fill
+        img_array[logo_mask(logo_rects.tobytes(), img_array.shape[:2])] = 255
     
-    start_time = time.time()
+    # Step 2: Cropping
+    if cropping_method == "vertical":
+        img_array = crop_vertical_only(img_array, white_threshold)
+    elif cropping_method == "horizontal":
+        img_array = crop_horizontal_only(img_array, white_threshold)
+    elif cropping_method == "both":
+        img_array = crop_both_fixed(img_array, white_threshold)
+    # else "none" - no cropping
     
-    for page_num in range(total_pages):
-        # Update main progress
-        main_progress.progress((page_num) / total_pages, text=f"🔄 Processing page {page_num + 1}/{total_pages}")
-        
-        page = doc[page_num]
-        # HIGH QUALITY: Use higher DPI for extraction
-        mat = fitz.Matrix(2.0, 2.0)  # 2x zoom for better quality
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Convert to RGB if needed
-        if pix.n < 4:
-            img_data = pix.tobytes("ppm")
-        else:
-            img_data = pix.tobytes("png")
-            
-        pil_image = Image.open(io.BytesIO(img_data))
-        
-        # Step 1: Logo Removal (all 6 logos)
-        sub_progress.progress(0.2, text=f"Removing logos...")
-        for i in range(1, 7):
-            logo_key = f'logo{i}'
-            if logo_key in logo_states and logo_states[logo_key].get('enabled', False):
-                coords = logo_states[logo_key].get('coords')
-                logo_type = logo_states[logo_key].get('type', 'rectangle')
-                if coords:
-                    pil_image = remove_logo_precise(pil_image, coords, logo_type, removal_method)
-        
-        # Step 2: Cropping
-        sub_progress.progress(0.6, text=f"Cropping image...")
-        if cropping_method == "vertical":
-            pil_image = crop_vertical_only(pil_image, white_threshold)
-        elif cropping_method == "horizontal":
-            pil_image = crop_horizontal_only(pil_image, white_threshold)
-        elif cropping_method == "both":
-            pil_image = crop_both_fixed(pil_image, white_threshold)
-        # else "none" - no cropping
-        
-        # Step 3: Finalize
-        sub_progress.progress(1.0, text=f"Finalizing page {page_num + 1}...")
-        processed_images.append(pil_image)
-        
-        # Estimate time remaining
-        elapsed_time = time.time() - start_time
-        pages_processed = page_num + 1
-        time_per_page = elapsed_time / pages_processed
-        remaining_pages = total_pages - pages_processed
-        estimated_remaining = time_per_page * remaining_pages
-        
-        time_tracker.text(f"⏱️ Estimated time remaining: {estimated_remaining:.1f}s")
-        
-        # Reset sub-progress for next page
-        if page_num < total_pages - 1:
-            sub_progress.progress(0.0, text="Ready for next page...")
-    
-    doc.close()
-    return processed_images
+    # Step 3: Encode - compressed bytes are much cheaper to send back than a pickled PIL image
+    image_bytes, ext = _fast_save(Image.fromarray(img_array))
+    return image_bytes, ext, (img_array.shape[1], img_array.shape[0])
+
+def _looks_photographic(img):
+    """Guess whether a page is photographic from its unique-colour ratio on a nearest-neighbour downsample"""
+    # Nearest sampling keeps the page's real colours - anti-aliased text stays a few ramps over mostly white
+    small = img.resize((max(img.width // 8, 1), max(img.height // 8, 1)), Image.Resampling.NEAREST)
+    pixel_count = small.width * small.height
+    colors = small.getcolors(maxcolors=pixel_count)
+    return len(colors) / pixel_count >= PHOTO_COLOR_RATIO
 
-def create_pdf_from_images(images):
-    """Create PDF from images using ReportLab - HIGH QUALITY"""
-    if not REPORTLAB_AVAILABLE:
-        raise ImportError("ReportLab is not installed. Please install with: pip install reportlab")
+def _fast_save(img):
+    """Encode a processed page compactly - palette PNG for text/line art, JPEG only for photographic content, fast PNG otherwise"""
+    buf = io.BytesIO()
+    # Text/line-art pages have few distinct colors and stay lossless in a palette
+    if img.getcolors(maxcolors=256) is not None:
+        img.quantize(colors=256, dither=Image.Dither.NONE).save(buf, format='PNG')
+        return buf.getvalue(), "png"
+    if _looks_photographic(img):
+        img.save(buf, format='JPEG', quality=PAGE_JPEG_QUALITY)
+        return buf.getvalue(), "jpg"
+    # Coloured text and anti-aliasing still compress well losslessly - light deflate keeps it fast
+    img.save(buf, format='PNG', compress_level=1)
+    return buf.getvalue(), "png"
+
+# Per-worker document, opened once by the pool initializer
+_WORKER_DOC = None
+
+def _init_page_worker(pdf_bytes):
+    """Open the PDF once in each worker process so pages can be rendered without re-sending the file"""
+    global _WORKER_DOC
+    _WORKER_DOC = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _render_and_process(page_index, zoom, logo_rects, white_threshold, cropping_method):
+    """Render one page from the worker's own document, then remove logos and crop it - returns (encoded bytes, extension, size)"""
+    page = _WORKER_DOC[page_index]
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+    if len(logo_rects):
+        # Logo coordinates are picked on the preview grid, so scale them up to this render
+        logo_rects = np.rint(logo_rects * (zoom / preview_scale(page))).astype(np.int32)
+    # Work directly on the pixmap's buffer; pix stays referenced until the page is encoded
+    img_array = pixmap_to_array(pix)
+    if len(logo_rects) and not img_array.flags.writeable:
+        img_array = img_array.copy()  # the logo fill writes in place
+    return _process_one_page(img_array, logo_rects, white_threshold, cropping_method)
+
+def process_pdf_with_logos(pdf_bytes, zoom, logo_states, white_threshold, cropping_method, main_progress, sub_progress, time_tracker):
+    """Render and process every page in a process pool, streaming results into a temp PDF and ZIP on disk"""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        total_pages = len(doc)
     
-    try:
-        if not images:
-            return io.BytesIO().getvalue()
-            
-        buffer = io.BytesIO()
-        
-        # Process first image to create canvas
-        first_img = images[0]
-        first_img_width, first_img_height = first_img.size
-        
-        # Ensure minimum dimensions
-        first_img_width = max(first_img_width, 1)
-        first_img_height = max(first_img_height, 1)
-        
-        c = canvas.Canvas(buffer, pagesize=(first_img_width, first_img_height))
-        
-        # Add first image
-        img_buffer = io.BytesIO()
-        # HIGH QUALITY: Save with maximum quality
-        first_img.save(img_buffer, format='PNG', optimize=False, quality=100)
-        img_buffer.seek(0)
-        pil_image = ImageReader(img_buffer)
-        c.drawImage(pil_image, 0, 0, width=first_img_width, height=first_img_height)
+    # Only the output paths outlive this call - no per-page images are kept around
+    pdf_path = _temp_output_path(".pdf")
+    zip_path = _temp_output_path(".zip")
+    output_doc = fitz.open()
+    pages_pending = 0
+    logo_rects = enabled_logo_rects(logo_states)
+    max_workers = min(os.cpu_count() or 1, 6)
+    
+    start_time = time.time()
+    sub_progress.progress(0.0, text=f"Processing pages on {max_workers} worker(s)...")
+    
+    # Every widget update is a websocket round-trip, so batch them for fast pages
+    progress_step = max(1, total_pages // 100)
+    last_ui_ts = 0.0
+    
+    # The PDF goes to each worker once through the initializer, not once per page
+    # STORED on purpose: PNG and JPEG are already compressed internally, so re-compressing
+    # burns CPU for ~0% savings. Switch to ZIP_DEFLATED, compresslevel=1 if raw bitmaps are ever added.
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_page_worker, initargs=(pdf_bytes,)) as executor, \
+            zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+        results = executor.map(
+            _render_and_process, range(total_pages),
+            itertools.repeat(zoom), itertools.repeat(logo_rects),
+            itertools.repeat(white_threshold), itertools.repeat(cropping_method),
+            chunksize=4
+        )
         
-        # Add remaining images
-        for i in range(1, len(images)):
-            img = images[i]
-            img_width, img_height = img.size
-            
-            # Ensure minimum dimensions
-            img_width = max(img_width, 1)
-            img_height = max(img_height, 1)
+        # map yields in page order, so progress reads naturally
+        for page_num, (image_bytes, ext, size) in enumerate(results):
+            # Write each page out as soon as it arrives - the workers' encoded bytes feed both the ZIP and the PDF
+            zip_file.writestr(f"page_{page_num+1:03d}.{ext}", image_bytes)
+            insert_image_page(output_doc, image_bytes, size)
+            image_bytes = None
+            pages_pending += 1
+            if pages_pending == OUTPUT_SPOOL_PAGES:
+                output_doc = _spool_output_doc(output_doc, pdf_path)
+                pages_pending = 0
+            pages_processed = page_num + 1
             
-            c.showPage()
-            c.setPageSize((img_width, img_height))
+            # Update progress from the main thread as pages complete
+            if pages_processed % progress_step == 0 or pages_processed == total_pages:
+                main_progress.progress(pages_processed / total_pages, text=f"🔄 Processed page {page_num + 1} ({pages_processed}/{total_pages})")
             
-            img_buffer = io.BytesIO()
-            # HIGH QUALITY: Save with maximum quality
-            img.save(img_buffer, format='PNG', optimize=False, quality=100)
-            img_buffer.seek(0)
-            pil_image = ImageReader(img_buffer)
-            c.drawImage(pil_image, 0, 0, width=img_width, height=img_height)
-        
-        c.save()
-        buffer.seek(0)
-        return buffer.getvalue()
-        
-    except Exception as e:
-        raise Exception(f"PDF creation failed: {str(e)}")
+            # Refresh the detail line and ETA at most twice a second
+            now = time.time()
+            if now - last_ui_ts >= 0.5 or pages_processed == total_pages:
+                last_ui_ts = now
+                sub_progress.progress(pages_processed / total_pages, text=f"Finished page {page_num + 1}...")
+                
+                # Estimate time remaining
+                elapsed_time = now - start_time
+                time_per_page = elapsed_time / pages_processed
+                remaining_pages = total_pages - pages_processed
+                estimated_remaining = time_per_page * remaining_pages
+                
+                time_tracker.text(f"⏱️ Estimated time remaining: {estimated_remaining:.1f}s")
+    
+    if pages_pending:
+        output_doc = _spool_output_doc(output_doc, pdf_path)
+    output_doc.close()
+    return pdf_path, zip_path, total_pages
+
+def _spool_output_doc(output_doc, pdf_path):
+    """Write the pages added so far to pdf_path and reopen it, so their image streams live on disk instead of in memory"""
+    if output_doc.name:
+        output_doc.saveIncr()  # already backed by pdf_path - append only the new pages
+    else:
+        output_doc.save(pdf_path, deflate=True)
+    output_doc.close()
+    return fitz.open(pdf_path)
+
+@st.cache_resource
+def _temp_output_registry():
+    """Process-wide set of temp output paths - whatever is left is deleted when the server exits"""
+    paths = set()
+    atexit.register(_remove_temp_outputs, paths)
+    return paths
+
+def _remove_temp_outputs(paths):
+    """Delete the given temp files if they still exist"""
+    for path in list(paths):
+        if os.path.exists(path):
+            os.remove(path)
+        paths.discard(path)
+
+def _temp_output_path(suffix):
+    """Reserve a named temp file for streamed output - removed by discard_processed_outputs or at exit"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        _temp_output_registry().add(tmp.name)
+        return tmp.name
+
+def discard_processed_outputs():
+    """Delete the temp PDF/ZIP from the previous run and forget their paths"""
+    for key in ('processed_pdf_path', 'processed_zip_path'):
+        path = st.session_state.get(key)
+        if path:
+            _remove_temp_outputs({path})
+            _temp_output_registry().discard(path)
+        st.session_state[key] = None
+
+def insert_image_page(output_doc, image_bytes, size):
+    """Append one encoded page image as a PDF page of exactly its size - MuPDF embeds JPEGs as-is"""
+    # Ensure minimum dimensions
+    page = output_doc.new_page(width=max(size[0], 1), height=max(size[1], 1))
+    page.insert_image(page.rect, stream=image_bytes)
 
 # STEP 1: FILE UPLOAD
 st.sidebar.subheader("1. Upload PDF")
@@ -323,10 +490,13 @@ uploaded_pdf = st.sidebar.file_uploader("Choose a PDF file", type="pdf")
 if uploaded_pdf:
     st.sidebar.success("✅ PDF uploaded successfully!")
     
-    # Extract all pages for logo setup
-    if st.session_state.all_page_images is None:
-        with st.spinner("Loading PDF pages for logo setup..."):
-            st.session_state.all_page_images = get_all_page_images(uploaded_pdf)
+    # Read the upload once per file and reuse the bytes across reruns
+    if st.session_state.get('pdf_file_id') != uploaded_pdf.file_id:
+        st.session_state.pdf_file_id = uploaded_pdf.file_id
+        discard_processed_outputs()  # results of the previous file are stale now
+        st.session_state.pdf_bytes = uploaded_pdf.getvalue()
+        # Content key for the render cache, so re-uploading the same file hits it too
+        st.session_state.pdf_digest = hashlib.blake2b(st.session_state.pdf_bytes, digest_size=8).hexdigest()
     
     # Step 2: Logo Setup
     st.sidebar.subheader("2. Logo Setup")
@@ -363,11 +533,6 @@ if uploaded_pdf:
     
     white_threshold = st.sidebar.slider("White Threshold", 200, 254, 245)
     
-    removal_method = st.sidebar.selectbox("Logo Removal Method", 
-                                        ["white", "smart"],
-                                        format_func=lambda x: "White Fill" if x == "white" else "Smart Background Fill",
-                                        help="Note: Smart fill works best with rectangle logos")
-    
     # Both-direction cropping as default
     cropping_method = st.sidebar.selectbox(
         "Cropping Method:",
@@ -381,6 +546,17 @@ if uploaded_pdf:
         index=0  # Default to "both"
     )
     
+    # Preview pages are rendered on demand; the quality selector only affects processing
+    zoom = QUALITY_ZOOM[quality_level]
+    try:
+        source_doc = load_fitz_doc(st.session_state.pdf_digest, st.session_state.pdf_bytes)
+        if source_doc.needs_pass:
+            raise ValueError("the PDF is password-protected")
+        page_count = source_doc.page_count
+    except Exception as e:
+        st.error(f"Error loading PDF: {str(e)}")
+        st.stop()
+    
     # Process button
     if st.sidebar.button("🚀 Process PDF", type="primary", use_container_width=True):
         with st.spinner("Processing PDF..."):
@@ -390,49 +566,43 @@ if uploaded_pdf:
             time_tracker = st.empty()
             
             # Process the PDF
-            st.session_state.processed_images = process_pdf_with_logos(
-                uploaded_pdf, 
+            discard_processed_outputs()
+            pdf_path, zip_path, page_count = process_pdf_with_logos(
+                st.session_state.pdf_bytes,
+                zoom,
                 st.session_state.logo_states if setup_logo == "6-Logo Setup" else {},
                 white_threshold, 
-                removal_method, 
                 cropping_method, 
                 main_progress, 
                 sub_progress, 
                 time_tracker
             )
+            st.session_state.processed_pdf_path = pdf_path
+            st.session_state.processed_zip_path = zip_path
             
             # Clear progress bars
             main_progress.empty()
             sub_progress.empty()
             time_tracker.empty()
             
-            st.success(f"✅ Processed {len(st.session_state.processed_images)} pages!")
+            st.success(f"✅ Processed {page_count} pages!")
 
-    # Display preview if images are available - FIXED VERSION
-    if st.session_state.all_page_images and len(st.session_state.all_page_images) > 1:
-        st.subheader("📄 PDF Preview")
-        page_num = st.slider("Select page to preview", 1, len(st.session_state.all_page_images), 1)
-        preview_image = st.session_state.all_page_images[page_num-1]
-        
-        # Create grid overlay
-        grid_overlay = create_grid_overlay(preview_image)
-        
-        # Combine original with grid
-        combined = Image.alpha_composite(preview_image.convert('RGBA'), grid_overlay)
-        st.image(combined, caption=f"Page {page_num} with coordinate grid", use_column_width=True)
-    elif st.session_state.all_page_images and len(st.session_state.all_page_images) == 1:
+    # Display preview - only the selected page is rendered
+    if page_count > 0:
         st.subheader("📄 PDF Preview")
-        preview_image = st.session_state.all_page_images[0]
+        page_num = st.slider("Select page to preview", 1, page_count, 1) if page_count > 1 else 1
+        preview_image = get_preview_image(st.session_state.pdf_digest, st.session_state.pdf_bytes, page_num - 1)
         
-        # Create grid overlay
-        grid_overlay = create_grid_overlay(preview_image)
-        
-        # Combine original with grid
-        combined = Image.alpha_composite(preview_image.convert('RGBA'), grid_overlay)
-        st.image(combined, caption="Page 1 with coordinate grid", use_column_width=True)
+        if preview_image is not None:
+            # Create grid overlay
+            grid_rgb, grid_alpha = create_grid_overlay(preview_image)
+            
+            # Combine original with grid - the page is opaque RGB, so a masked paste is all the blending needed
+            preview_image.paste(grid_rgb, mask=grid_alpha)
+            st.image(preview_image, caption=f"Page {page_num} with coordinate grid", use_column_width=True)
 
 # Download section (after processing)
-if st.session_state.processed_images:
+if st.session_state.processed_pdf_path:
     st.sidebar.subheader("4. Download Results")
     
     # Create columns for download buttons
@@ -441,33 +611,31 @@ if st.session_state.processed_images:
     # PDF download
     with col1:
         try:
-            pdf_data = create_pdf_from_images(st.session_state.processed_images)
-            st.download_button(
-                label="📄 Download as PDF",
-                data=pdf_data,
-                file_name="processed_document.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
+            # Served straight from the temp file written during processing
+            with open(st.session_state.processed_pdf_path, 'rb') as pdf_file:
+                st.download_button(
+                    label="📄 Download as PDF",
+                    data=pdf_file,
+                    file_name="processed_document.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
         except Exception as e:
-            st.error(f"PDF creation failed: {str(e)}")
+            st.error(f"PDF download failed: {str(e)}")
     
     # ZIP download
     with col2:
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
-            for i, img in enumerate(st.session_state.processed_images):
-                img_bytes = io.BytesIO()
-                img.save(img_bytes, format='PNG', optimize=False, quality=100)
-                zip_file.writestr(f"page_{i+1:03d}.png", img_bytes.getvalue())
-        
-        st.download_button(
-            label="💾 Download as ZIP",
-            data=zip_buffer.getvalue(),
-            file_name="processed_pages.zip",
-            mime="application/zip",
-            use_container_width=True
-        )
+        try:
+            with open(st.session_state.processed_zip_path, 'rb') as zip_data:
+                st.download_button(
+                    label="💾 Download as ZIP",
+                    data=zip_data,
+                    file_name="processed_pages.zip",
+                    mime="application/zip",
+                    use_container_width=True
+                )
+        except Exception as e:
+            st.error(f"ZIP download failed: {str(e)}")
 
 # Instructions
 with st.expander("📖 Instructions"):
@@ -488,5 +656,8 @@ with st.expander("📖 Instructions"):
 # Display system info
 st.sidebar.markdown("---")
 st.sidebar.markdown("**System Info**")
-st.sidebar.write(f"ReportLab: {'✅' if REPORTLAB_AVAILABLE else '❌'}")
 st.sidebar.write(f"python-docx: {'✅' if DOCX_AVAILABLE else '❌'}")
+st.sidebar.write(f"pyvips: {'✅' if PYVIPS_AVAILABLE else '❌'}")
+st.sidebar.write(f"numba: {'✅' if NUMBA_AVAILABLE else '❌'}")
+# Pillow-SIMD releases carry a .postN suffix on the Pillow version they track
+st.sidebar.write(f"Pillow: {PIL.__version__} {'(SIMD ✅)' if '.post' in PIL.__version__ else ''}")
@@ -945,7 +945,8 @@ if uploaded_pdf:
         with cols[col_index]:
             # ZIP download
             zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+            # PNG is already DEFLATE-compressed, so STORED skips a pointless second pass
+            with zipfile.ZipFile(zip_buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
                 for i, img in enumerate(st.session_state.processed_images):
                     img_bytes = io.BytesIO()
                     img.save(img_bytes, format='PNG')
@@ -1,5 +1,4 @@
 import streamlit as st
-import PyPDF2
 import fitz  # PyMuPDF
 from PIL import Image, ImageEnhance, ImageOps
 import io
@@ -225,7 +224,7 @@ def move_file_down():
 
 def merge_pdfs_with_progress(pdf_files, progress_bar, status_text):
     """Merge multiple PDF files into one with progress tracking"""
-    pdf_merger = PyPDF2.PdfMerger()
+    output_doc = fitz.open()
     total_files = len(pdf_files)
     start_time = time.time()
     
@@ -243,16 +242,14 @@ def merge_pdfs_with_progress(pdf_files, progress_bar, status_text):
         else:
             status_text.text(f"📄 Merging {i+1}/{total_files} - {uploaded_file.name}")
         
-        pdf_merger.append(uploaded_file)
-        
-        # Small delay to show progress
-        time.sleep(0.5)
+        # Copy all pages of this file in one native MuPDF call
+        with fitz.open(stream=uploaded_file.getvalue(), filetype="pdf") as src_doc:
+            output_doc.insert_pdf(src_doc)
     
-    output_buffer = io.BytesIO()
-    pdf_merger.write(output_buffer)
-    pdf_merger.close()
+    pdf_bytes = output_doc.tobytes(garbage=3, deflate=True)
+    output_doc.close()
     
-    return output_buffer.getvalue()
+    return pdf_bytes
 
 def invert_pdf_colors_with_progress(pdf_data, progress_bar, status_text):
     """Invert colors of all pages in PDF with progress tracking"""